@@ -1,3 +1,23 @@
 from django.contrib import admin
-from .models import Account, Category, CategoryGroup, BudgetMonth, BudgetAllocation, Payee, Transaction
-admin.site.register([Category, Account, CategoryGroup, BudgetMonth, BudgetAllocation, Payee, Transaction])
\ No newline at end of file
+from .models import Account, Category, CategoryGroup, BudgetMonth, BudgetAllocation, Payee, Reconciliation, Transaction
+from .reconciliation import LOCKED_FIELDS
+
+admin.site.register([Category, Account, CategoryGroup, BudgetMonth, BudgetAllocation, Payee, Reconciliation])
+
+
+@admin.register(Transaction)
+class TransactionAdmin(admin.ModelAdmin):
+    list_display = ("date", "account", "payee", "memo", "amount", "cleared", "reconciled")
+    list_filter = ("cleared", "reconciled")
+    list_select_related = ("account", "payee")
+
+    def get_readonly_fields(self, request, obj=None):
+        # Reconciled rows refuse balance changes on save (tracker/signals.py); show them as locked instead
+        if obj is not None and obj.reconciled:
+            return [field.removesuffix("_id") for field in LOCKED_FIELDS]
+        return super().get_readonly_fields(request, obj)
+
+    def has_delete_permission(self, request, obj=None):
+        if obj is not None and obj.reconciled:
+            return False
+        return super().has_delete_permission(request, obj)
@@ -0,0 +1,40 @@
+from decimal import Decimal
+
+from django.db import transaction
+
+from .caching import bump_version
+from .closing import reopen_from
+from .models import BudgetAllocation, BudgetMonth, Category
+from .rollups import apply_month_deltas
+from .shards import ledger_db
+
+ZERO = Decimal("0.00")
+
+
+def upsert_allocations(user, sel_month, amounts):
+    """
+    Set the budgeted amount for many categories in ``sel_month`` at once ({category_id: Decimal}).
+    One transaction and one INSERT ... ON CONFLICT DO UPDATE, with the rollups moved by the
+    difference from the previous amounts. Raises Category.DoesNotExist for ids the user doesn't own.
+    """
+    with transaction.atomic(using=ledger_db()):
+        bm, _ = BudgetMonth.objects.get_or_create(owner=user, month=sel_month)
+        owned = set(Category.objects.filter(owner=user, id__in=amounts).values_list("id", flat=True))
+        if owned != set(amounts):
+            raise Category.DoesNotExist(f"Unknown categories: {sorted(set(amounts) - owned)}")
+
+        previous = dict(
+            BudgetAllocation.objects.select_for_update()
+            .filter(owner=user, month=bm, category_id__in=amounts)
+            .values_list("category_id", "budgeted")
+        )
+        BudgetAllocation.objects.bulk_create(
+            [BudgetAllocation(owner=user, month=bm, category_id=c, budgeted=amount) for c, amount in amounts.items()],
+            update_conflicts=True,
+            unique_fields=["owner", "month", "category"],
+            update_fields=["budgeted", "updated_at"],
+        )
+        # bulk_create skips the model signals, so fold the change into the rollups here
+        apply_month_deltas(user.id, sel_month, {c: amount - previous.get(c, ZERO) for c, amount in amounts.items()})
+        reopen_from(user.id, sel_month)
+    bump_version(user.id)
@@ -0,0 +1,257 @@
+"""
+Async JSON API for SPA and mobile clients and the dashboard's in-place updates. Serve through
+finance_tracker.asgi (e.g. ``uvicorn finance_tracker.asgi:application``) so requests don't
+hold a thread each.
+"""
+import json
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import require_GET, require_http_methods, require_POST
+
+from .allocations import upsert_allocations
+from .budget import adashboard_groups, adashboard_summary, budget_fragments
+from .forms import TransactionFilterForm
+from .jobs import EXPORT_FORMATS, enqueue
+from .models import Category, Job, Transaction
+from .register import akeyset_page, decode_cursor, filter_transactions
+from .reports import atrend_report, parse_trend_params
+from .routers import replica_reads
+from .search import asearch_page, parse_page
+from .typeahead import SOURCES, suggest
+from .views import parse_month_param, render_budget_fragments
+
+
+def api_login_required(view):
+    """Like login_required, but answers 401 JSON and hands the resolved user to the view."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return JsonResponse({"error": "Authentication required."}, status=401)
+        return await view(request, user, *args, **kwargs)
+    return wrapper
+
+
+def serialize_summary(summary):
+    return {
+        "month": summary["sel_month"].strftime("%Y-%m"),
+        "prev_month": summary["prev_month"],
+        "next_month": summary["next_month"],
+        "tbb": str(summary["tbb"]),
+        "budgeted_this_month": str(summary["budgeted_this_month"]),
+        "activity_this_month": str(summary["activity_this_month"]),
+        "on_budget_balance": str(summary["on_budget_balance"]),
+    }
+
+
+def serialize_row(row):
+    return {
+        "category_id": row["category"].id,
+        "name": row["category"].name,
+        "budgeted": str(row["budgeted"]),
+        "activity": str(row["activity"]),
+        "available": str(row["available"]),
+    }
+
+
+def serialize_group(group):
+    return {
+        "id": group["id"],
+        "name": group["name"],
+        "budgeted": str(group["budgeted"]),
+        "activity": str(group["activity"]),
+        "available": str(group["available"]),
+    }
+
+
+def serialize_transaction(tx):
+    return {
+        "id": tx.id,
+        "date": tx.date.isoformat(),
+        "account": tx.account.name,
+        "payee": tx.payee.name if tx.payee else None,
+        "category": tx.category.name if tx.category else None,
+        "memo": tx.memo,
+        "amount": str(tx.amount),
+        "cleared": tx.cleared,
+        "reconciled": tx.reconciled,
+    }
+
+
+def serialize_job(job):
+    done = job.kind == "export_transactions" and job.status == Job.DONE
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "progress": job.progress,
+        "total": job.total,
+        "message": job.message,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "created_at": job.created_at.isoformat(),
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "download": reverse("job_download", args=[job.id]) if done else None,
+    }
+
+
+@require_GET
+@api_login_required
+@replica_reads
+async def api_summary(request, user):
+    sel_month, _ = parse_month_param(request)
+    return JsonResponse(serialize_summary(await adashboard_summary(user, sel_month)))
+
+
+@require_GET
+@api_login_required
+@replica_reads
+async def api_categories(request, user):
+    sel_month, _ = parse_month_param(request)
+    groups = await adashboard_groups(user, sel_month)
+    return JsonResponse({
+        "month": sel_month.strftime("%Y-%m"),
+        "groups": [
+            {**serialize_group(g), "rows": [serialize_row(r) for r in g["rows"]]}
+            for g in groups
+        ],
+    })
+
+
+@require_GET
+@api_login_required
+async def api_transactions(request, user):
+    form = TransactionFilterForm(request.GET or None, owner=user)
+    if request.GET and not await sync_to_async(form.is_valid)():
+        return JsonResponse({"errors": form.errors}, status=400)
+
+    tx = Transaction.objects.filter(owner=user).select_related("payee", "category", "account")
+    if form.is_bound:
+        tx = filter_transactions(tx, form.cleaned_data)
+        if form.cleaned_data["q"]:
+            # Ranked matches page by number instead of by (date, id) cursor
+            page = parse_page(request.GET.get("page"))
+            rows, has_more = await asearch_page(tx, form.cleaned_data["q"], page)
+            return JsonResponse({
+                "results": [serialize_transaction(t) for t in rows],
+                "page": page,
+                "next_page": page + 1 if has_more else None,
+            })
+    rows, newer, older = await akeyset_page(
+        tx,
+        after=decode_cursor(request.GET.get("after")),
+        before=decode_cursor(request.GET.get("before")),
+    )
+    return JsonResponse({
+        "results": [serialize_transaction(t) for t in rows],
+        "newer": newer,
+        "older": older,
+    })
+
+
+@require_GET
+@api_login_required
+async def api_typeahead(request, user):
+    kind = request.GET.get("kind", "payee")
+    if kind not in SOURCES:
+        return JsonResponse({"error": f"kind must be one of {', '.join(SOURCES)}"}, status=400)
+    prefix = request.GET.get("q", "")
+    return JsonResponse({"results": await sync_to_async(suggest)(kind, user.id, prefix)})
+
+
+def parse_allocations(body):
+    """Validate {"month": "YYYY-MM", "allocations": [{"category_id", "budgeted"}, ...]}."""
+    data = json.loads(body)
+    sel_month = datetime.strptime(data["month"], "%Y-%m").date().replace(day=1)
+    amounts = {}
+    for item in data["allocations"]:
+        amount = Decimal(str(item["budgeted"]).replace(",", "").strip() or "0")
+        if not amount.is_finite():
+            raise ValueError(f"budgeted must be a finite amount, not {amount}")
+        amounts[int(item["category_id"])] = amount.quantize(Decimal("0.01"))
+    return sel_month, amounts
+
+
+@require_POST
+@api_login_required
+async def api_budget_allocate(request, user):
+    """
+    Upsert many category allocations for one month. Answers with only what changed: the rows,
+    their group subtotals and the summary, as JSON or (Accept: text/html) as dashboard fragments.
+    """
+    try:
+        sel_month, amounts = parse_allocations(request.body)
+    except (ValueError, KeyError, TypeError, InvalidOperation):
+        return JsonResponse(
+            {"error": 'Expected {"month": "YYYY-MM", "allocations": [{"category_id": 1, "budgeted": "10.00"}]}'},
+            status=400,
+        )
+    try:
+        await sync_to_async(upsert_allocations)(user, sel_month, amounts)
+    except Category.DoesNotExist as e:
+        return JsonResponse({"error": str(e)}, status=404)
+
+    fragments = await sync_to_async(budget_fragments)(user, sel_month, list(amounts))
+    if "text/html" in request.headers.get("Accept", ""):
+        return render_budget_fragments(request, fragments, sel_month)
+    return JsonResponse({
+        "rows": [serialize_row(r) for r in fragments["rows"]],
+        "groups": [serialize_group(g) for g in fragments["groups"]],
+        "summary": serialize_summary(fragments["summary"]),
+    })
+
+
+@require_GET
+@api_login_required
+@replica_reads
+async def api_trends(request, user):
+    end, _ = parse_month_param(request)
+    months, window = parse_trend_params(request.GET)
+    # Decimals and None serialise through DjangoJSONEncoder (amounts become strings)
+    return JsonResponse(await atrend_report(user, end, months, window))
+
+
+# Jobs a client may start without an upload; statement imports go through the upload form
+API_JOB_KINDS = ("rebuild_rollups", "recompute_balances", "export_transactions")
+RECENT_JOBS = 10
+
+
+@require_http_methods(["GET", "POST"])
+@api_login_required
+async def api_jobs(request, user):
+    """GET: the user's recent jobs, newest first. POST {"kind", ...params}: queue a job (202)."""
+    if request.method == "POST":
+        try:
+            data = json.loads(request.body)
+            kind = data.pop("kind")
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return JsonResponse({"error": 'Expected {"kind": "rebuild_rollups"}'}, status=400)
+        if kind not in API_JOB_KINDS:
+            return JsonResponse({"error": f"kind must be one of {', '.join(API_JOB_KINDS)}"}, status=400)
+        if kind == "export_transactions":
+            params = {"format": data.get("format", "csv"), "query": str(data.get("query", ""))}
+            if params["format"] not in EXPORT_FORMATS:
+                return JsonResponse({"error": f"format must be one of {', '.join(EXPORT_FORMATS)}"}, status=400)
+        else:
+            params = {"since_close": bool(data.get("since_close"))} if kind == "rebuild_rollups" else {}
+        job = await sync_to_async(enqueue)(user, kind, **params)
+        return JsonResponse(serialize_job(job), status=202)
+
+    # Progress lives on the primary: a replica would lag behind the workers' reports
+    jobs = Job.objects.filter(owner=user).order_by("-created_at", "-id").defer("payload", "error", "result")
+    return JsonResponse({"results": [serialize_job(j) async for j in jobs[:RECENT_JOBS]]})
+
+
+@require_GET
+@api_login_required
+async def api_job(request, user, job_id):
+    try:
+        job = await Job.objects.defer("payload", "error").aget(pk=job_id, owner=user)
+    except Job.DoesNotExist:
+        return JsonResponse({"error": "No such job."}, status=404)
+    return JsonResponse({**serialize_job(job), "result": job.result})
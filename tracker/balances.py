@@ -0,0 +1,48 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+from .caching import bump_version
+from .models import Account, Transaction
+from .shards import ledger_db
+
+ZERO = Decimal("0.00")
+
+
+def apply_balance_delta(account_id, amount, cleared):
+    if account_id is None:
+        return
+    if cleared:
+        changes = {"cleared_balance": F("cleared_balance") + amount}
+    else:
+        changes = {"uncleared_balance": F("uncleared_balance") + amount}
+    # updated_at moves even for a zero amount: it is how deleting a transaction reaches the data fingerprint
+    Account.objects.filter(pk=account_id).update(balance=F("balance") + amount, updated_at=timezone.now(), **changes)
+
+
+def recompute_balances(owner_id):
+    """Rebuild every account balance for a user from one grouped query over the ledger."""
+    totals = {
+        r["account_id"]: r
+        for r in Transaction.objects.filter(owner_id=owner_id)
+        .values("account_id")
+        .annotate(
+            cleared_sum=Sum("amount", filter=Q(cleared=True)),
+            uncleared_sum=Sum("amount", filter=Q(cleared=False)),
+        )
+        .order_by()
+    }
+    accounts = list(Account.objects.filter(owner_id=owner_id))
+    for account in accounts:
+        t = totals.get(account.id, {})
+        account.cleared_balance = account.opening_balance + (t.get("cleared_sum") or ZERO)
+        account.uncleared_balance = t.get("uncleared_sum") or ZERO
+        account.balance = account.cleared_balance + account.uncleared_balance
+        account.updated_at = timezone.now()
+    with transaction.atomic(using=ledger_db()):
+        Account.objects.bulk_update(accounts, ["balance", "cleared_balance", "uncleared_balance", "updated_at"],
+                                    batch_size=500)
+    bump_version(owner_id)
+    return len(accounts)
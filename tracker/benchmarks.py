@@ -0,0 +1,155 @@
+"""
+Benchmarks for the main pages, run against generated datasets of increasing size.
+
+Each view is requested through the test client with the page cache disabled, so the numbers
+are for the full computation. Wall time is taken over ``repeat`` runs; query count and peak
+Python memory (tracemalloc) come from one extra run, since tracing slows everything down.
+All generated data is rolled back afterwards.
+"""
+import json
+import statistics
+import time
+import tracemalloc
+from datetime import date
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Category
+from .synthetic import generate_user
+
+DATASETS = {
+    "small": {"months": 3, "tx_per_month": 40},
+    "medium": {"months": 12, "tx_per_month": 200},
+    "large": {"months": 24, "tx_per_month": 1000, "categories": 50},
+}
+BASELINE_PATH = Path(__file__).with_name("benchmark_baseline.json")
+TOLERANCE = 2.0  # how many times slower than the baseline a view may get before failing
+
+BENCH_SETTINGS = {
+    "CACHES": {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}},
+    "STORAGES": {
+        **settings.STORAGES,
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    },
+    "ALLOWED_HOSTS": [*settings.ALLOWED_HOSTS, "testserver"],
+}
+
+
+def scenarios(user, month):
+    """view name -> (method, url, data) for one request against ``user``'s data."""
+    month_value = f"{month:%Y-%m}"
+    category = Category.objects.filter(owner=user).order_by("id").first()
+    return {
+        "dashboard": ("get", reverse("dashboard"), {"month": month_value}),
+        "transactions": ("get", reverse("transactions"), {}),
+        "budget_allocate": ("post", reverse("budget_allocate"),
+                            {"category_id": category.id, "month": month_value, "budgeted": "123.45"}),
+        "categories": ("get", reverse("categories"), {}),
+    }
+
+
+def measure(client, method, url, data, repeat):
+    def request():
+        response = getattr(client, method)(url, data)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method.upper()} {url} returned {response.status_code}")
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        request()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as ctx:
+            request()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "wall_ms": {
+            "median": round(statistics.median(timings), 2),
+            "min": round(min(timings), 2),
+            "max": round(max(timings), 2),
+        },
+        "queries": len(ctx.captured_queries),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def run_benchmarks(datasets=None, repeat=5, seed=0, log=None):
+    """Generate each dataset, time every scenario against it, and return the results as a dict."""
+    results = {}
+    with override_settings(**BENCH_SETTINGS):
+        for name in datasets or DATASETS:
+            with transaction.atomic():
+                started = time.perf_counter()
+                username, generated = generate_user(f"bench-{name}", seed=seed, **DATASETS[name])
+                if log:
+                    log(f"{name}: generated {generated['transactions']} transactions "
+                        f"in {time.perf_counter() - started:.1f}s")
+
+                user = User.objects.get(username=username)
+                client = Client()
+                client.force_login(user)
+                views = {}
+                for view, (method, url, data) in scenarios(user, date.today().replace(day=1)).items():
+                    views[view] = measure(client, method, url, data, repeat)
+                    if log:
+                        log(f"{name}/{view}: {views[view]['wall_ms']['median']}ms, "
+                            f"{views[view]['queries']} queries, {views[view]['peak_kib']} KiB peak")
+                results[name] = {"transactions": generated["transactions"], "views": views}
+                transaction.set_rollback(True)
+
+    return {
+        "meta": {
+            "django": django.get_version(),
+            "vendor": connection.vendor,
+            "repeat": repeat,
+            "seed": seed,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def load_baseline(path=BASELINE_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+
+def baseline_from(report):
+    """The thresholds worth keeping from a report: query count and median wall time per view."""
+    return {
+        dataset: {view: {"queries": m["queries"], "wall_ms": m["wall_ms"]["median"]} for view, m in r["views"].items()}
+        for dataset, r in report["results"].items()
+    }
+
+
+def compare(report, baseline, tolerance=TOLERANCE, latency=True):
+    """
+    Return a message for every view whose query count or median latency exceeds the baseline.
+    ``latency=False`` checks query counts only, for runs on machines the timings don't transfer to.
+    """
+    failures = []
+    for dataset, result in report["results"].items():
+        for view, m in result["views"].items():
+            limit = baseline.get(dataset, {}).get(view)
+            if not limit:
+                continue
+            if m["queries"] > limit["queries"]:
+                failures.append(f"{dataset}/{view}: {m['queries']} queries, baseline {limit['queries']}")
+            if latency and m["wall_ms"]["median"] > limit["wall_ms"] * tolerance:
+                failures.append(
+                    f"{dataset}/{view}: {m['wall_ms']['median']}ms, baseline {limit['wall_ms']}ms x{tolerance}"
+                )
+    return failures
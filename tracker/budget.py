@@ -0,0 +1,224 @@
+import asyncio
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db.models import OuterRef, Subquery, Sum
+
+from .models import (
+    Account,
+    CategoryGroup,
+    Category,
+    BudgetMonth,
+    BudgetAllocation,
+    CategoryMonthRollup,
+    Transaction,
+)
+
+ZERO = Decimal("0.00")
+
+
+def money(x):
+    if x is None:
+        return Decimal("0.00")
+    return Decimal(x).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+# --- month helpers ---
+def first_of_month(d: date) -> date:
+    return d.replace(day=1)
+
+
+def next_month_start(d: date) -> date:
+    return (d.replace(day=28) + (date.resolution * 4)).replace(day=1)
+
+
+def prev_month_start(d: date) -> date:
+    return (d.replace(day=1) - date.resolution).replace(day=1)
+
+
+def months_ending(end: date, count: int) -> list:
+    """The ``count`` first-of-month dates ending with ``end``'s month, oldest first."""
+    starts = [first_of_month(end)]
+    while len(starts) < count:
+        starts.append(prev_month_start(starts[-1]))
+    return starts[::-1]
+
+
+# --- dashboard ---
+# The query builders and row assembly below are shared by the sync dashboard view and
+# the async JSON API; only the way the querysets are evaluated differs.
+def summary_aggregates(user, sel_month):
+    """name -> (queryset, aggregate kwargs) for each independent summary number."""
+    next_month = next_month_start(sel_month)
+    return {
+        "balances": (
+            Account.objects.filter(owner=user, on_budget=True),
+            {"balance": Sum("balance"), "opening": Sum("opening_balance")},
+        ),
+        # Two narrow aggregates rather than one conditional one, so each is served by its own index
+        "activity": (
+            Transaction.objects.filter(owner=user, date__gte=sel_month, date__lt=next_month),
+            {"s": Sum("amount")},
+        ),
+        "income": (Transaction.objects.filter(owner=user, amount__gt=0), {"s": Sum("amount")}),
+        "budgeted": (BudgetAllocation.objects.filter(owner=user), {"s": Sum("budgeted")}),
+        "month": (month_rollups_queryset(user, sel_month), {"budgeted": Sum("budgeted")}),
+    }
+
+
+def month_rollups_queryset(user, sel_month):
+    return CategoryMonthRollup.objects.filter(owner=user, month=sel_month)
+
+
+def categories_queryset(user, sel_month):
+    """Visible categories annotated with their latest ``available`` and this month's allocation id."""
+    latest_available = CategoryMonthRollup.objects.filter(
+        owner=user, category=OuterRef("pk"), month__lte=sel_month
+    ).order_by("-month").values("available")[:1]
+    allocation_id = BudgetAllocation.objects.filter(
+        owner=user, month__month=sel_month, category=OuterRef("pk")
+    ).values("id")[:1]
+    return Category.objects.filter(owner=user, hidden=False).annotate(
+        available=Subquery(latest_available),
+        allocation_id=Subquery(allocation_id),
+    ).order_by("sort", "name")
+
+
+def groups_queryset(user):
+    return CategoryGroup.objects.filter(owner=user).order_by("sort", "name")
+
+
+def build_summary(sel_month, totals):
+    on_budget_balance = totals["balances"]["balance"] or ZERO
+    on_budget_opening = totals["balances"]["opening"] or ZERO
+    activity_this_month = totals["activity"]["s"] or ZERO
+    total_income_all = totals["income"]["s"] or ZERO
+    total_budgeted_all = totals["budgeted"]["s"] or ZERO
+    budgeted_this_month = totals["month"]["budgeted"] or ZERO
+
+    # Account balances already include the ledger, so only the opening balances are added to income
+    tbb = (on_budget_opening + total_income_all) - total_budgeted_all
+
+    return {
+        "sel_month": sel_month,
+        "prev_month": prev_month_start(sel_month).strftime("%Y-%m"),
+        "next_month": next_month_start(sel_month).strftime("%Y-%m"),
+        "tbb": money(tbb),
+        "budgeted_this_month": money(budgeted_this_month),
+        "activity_this_month": money(activity_this_month),
+        "on_budget_balance": money(on_budget_balance),
+    }
+
+
+def build_row(category, rollup):
+    return {
+        "category": category,
+        "budgeted": money(rollup.budgeted if rollup else ZERO),
+        "activity": money(rollup.activity if rollup else ZERO),
+        "available": money(category.available),
+        "allocation_id": category.allocation_id,
+    }
+
+
+def group_totals(rows):
+    return {
+        field: money(sum((r[field] for r in rows), ZERO)) for field in ("budgeted", "activity", "available")
+    }
+
+
+def build_groups(groups, categories, month_rollups):
+    rows_by_group = {}
+    for c in categories:
+        rows_by_group.setdefault(c.group_id, []).append(build_row(c, month_rollups.get(c.id)))
+    return [
+        {"name": g.name, "id": g.id, "rows": rows_by_group.get(g.id, []), **group_totals(rows_by_group.get(g.id, []))}
+        for g in groups
+    ]
+
+
+def dashboard_context(user, sel_month):
+    """
+    Build the dashboard summary and group/category rows for ``sel_month``.
+
+    Per-category numbers are read from CategoryMonthRollup (this month's row plus
+    the latest ``available`` at or before it), so the work is a fixed set of
+    queries regardless of how many categories or how much history the user has.
+    """
+    # Ensure a BudgetMonth exists
+    BudgetMonth.objects.get_or_create(owner=user, month=sel_month)
+
+    aggregates = summary_aggregates(user, sel_month)
+    # This month's rollups are fetched for the rows anyway, so their total needs no query of its own
+    del aggregates["month"]
+    totals = {name: qs.aggregate(**aggs) for name, (qs, aggs) in aggregates.items()}
+    month_rollups = {r.category_id: r for r in month_rollups_queryset(user, sel_month)}
+    totals["month"] = {"budgeted": sum((r.budgeted for r in month_rollups.values()), ZERO)}
+    groups = build_groups(groups_queryset(user), categories_queryset(user, sel_month), month_rollups)
+    return {**build_summary(sel_month, totals), "groups": groups}
+
+
+def dashboard_summary(user, sel_month):
+    totals = {name: qs.aggregate(**aggs) for name, (qs, aggs) in summary_aggregates(user, sel_month).items()}
+    return build_summary(sel_month, totals)
+
+
+def category_rows(user, sel_month, category_ids):
+    """Dashboard rows for just ``category_ids``, for responses that update a few rows in place."""
+    month_rollups = {
+        r.category_id: r for r in month_rollups_queryset(user, sel_month).filter(category_id__in=category_ids)
+    }
+    return [
+        build_row(c, month_rollups.get(c.id))
+        for c in categories_queryset(user, sel_month).filter(id__in=category_ids).select_related("group")
+    ]
+
+
+def group_subtotals(user, sel_month, group_ids):
+    """{group_id: {budgeted, activity, available}} for just ``group_ids``, summed in the database."""
+    totals = {gid: {"budgeted": ZERO, "activity": ZERO, "available": ZERO} for gid in group_ids}
+    month = month_rollups_queryset(user, sel_month).filter(category__group_id__in=group_ids, category__hidden=False) \
+        .values("category__group_id").annotate(budgeted=Sum("budgeted"), activity=Sum("activity")).order_by()
+    for r in month:
+        totals[r["category__group_id"]].update(budgeted=r["budgeted"], activity=r["activity"])
+    available = categories_queryset(user, sel_month).filter(group_id__in=group_ids) \
+        .values("group_id").annotate(total=Sum("available")).order_by()
+    for r in available:
+        totals[r["group_id"]]["available"] = r["total"] or ZERO
+    return {gid: {field: money(v) for field, v in t.items()} for gid, t in totals.items()}
+
+
+def budget_fragments(user, sel_month, category_ids):
+    """
+    What one batch of allocation edits can change on the dashboard: the edited rows, their
+    groups' subtotals and the summary cards. Every query is bounded by the edited categories
+    (or is a single aggregate), so the cost doesn't grow with the size of the budget.
+    """
+    rows = category_rows(user, sel_month, category_ids)
+    names = {r["category"].group_id: r["category"].group.name for r in rows}
+    subtotals = group_subtotals(user, sel_month, sorted(names))
+    return {
+        "rows": rows,
+        "groups": [{"id": gid, "name": names[gid], **totals} for gid, totals in subtotals.items()],
+        "summary": dashboard_summary(user, sel_month),
+    }
+
+
+# --- async variants for the JSON API ---
+async def alist(qs):
+    return [obj async for obj in qs]
+
+
+async def adashboard_summary(user, sel_month):
+    """Summary numbers with every independent aggregate awaited concurrently."""
+    aggregates = summary_aggregates(user, sel_month)
+    results = await asyncio.gather(*(qs.aaggregate(**aggs) for qs, aggs in aggregates.values()))
+    return build_summary(sel_month, dict(zip(aggregates, results)))
+
+
+async def adashboard_groups(user, sel_month):
+    groups, categories, rollups = await asyncio.gather(
+        alist(groups_queryset(user)),
+        alist(categories_queryset(user, sel_month)),
+        alist(month_rollups_queryset(user, sel_month)),
+    )
+    return build_groups(groups, categories, {r.category_id: r for r in rollups})
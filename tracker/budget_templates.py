@@ -0,0 +1,106 @@
+"""
+Starter budgets a user can pick at signup, defined as data: template -> groups -> categories.
+Provisioning writes every group in one ``bulk_create`` and every category in a second one,
+however many users are provisioned at once.
+"""
+from django.db import transaction
+
+from .caching import bump_version
+from .models import Category, CategoryGroup
+from .shards import ledger_db
+
+DEFAULT_TEMPLATE = "standard"
+BATCH_SIZE = 500
+
+TEMPLATES = {
+    "standard": {
+        "label": "Standard",
+        "groups": [
+            ("Bills", ["Insurance", "Healthcare", "Household Supplies"]),
+            ("Needs", ["Rent/Mortgage", "Utilities", "Groceries", "Transportation"]),
+            ("Wants", ["Dining Out", "Entertainment", "Personal Care"]),
+            ("Future Planning", ["Emergency Fund", "Retirement", "Investments"]),
+        ],
+    },
+    "ynab_classic": {
+        "label": "YNAB classic",
+        "groups": [
+            ("Immediate Obligations", ["Rent/Mortgage", "Electric", "Water", "Internet", "Groceries",
+                                       "Transportation", "Interest & Fees"]),
+            ("True Expenses", ["Auto Maintenance", "Home Maintenance", "Renter's/Home Insurance", "Medical",
+                               "Clothing", "Gifts", "Giving", "Computer Replacement", "Software Subscriptions",
+                               "Stuff I Forgot to Budget For"]),
+            ("Debt Payments", ["Student Loan", "Auto Loan"]),
+            ("Quality of Life Goals", ["Vacation", "Fitness", "Education"]),
+            ("Just for Fun", ["Dining Out", "Gaming", "Music", "Fun Money"]),
+        ],
+    },
+    "student": {
+        "label": "Student",
+        "groups": [
+            ("Essentials", ["Rent", "Groceries", "Phone", "Transit"]),
+            ("School", ["Tuition", "Books & Supplies", "Student Loan"]),
+            ("Fun", ["Eating Out", "Entertainment", "Travel Home"]),
+            ("Savings", ["Emergency Fund"]),
+        ],
+    },
+}
+
+
+def template_choices():
+    return [(key, t["label"]) for key, t in TEMPLATES.items()]
+
+
+def provision_template(users, template=DEFAULT_TEMPLATE, existing=True):
+    """
+    Give every user in ``users`` the groups and categories of ``template``.
+
+    With ``existing`` (the default) groups and categories the user already has are matched by
+    name and skipped, so re-running is harmless; brand-new users can pass ``existing=False``
+    to skip those lookups and get exactly two INSERTs. Returns (groups, categories) created.
+    """
+    spec = TEMPLATES[template]["groups"]
+    owner_ids = [u.pk for u in users]
+    if not owner_ids:
+        return 0, 0
+
+    group_ids, have = {}, set()
+    if existing:
+        for owner_id, name, pk in CategoryGroup.objects.filter(owner_id__in=owner_ids) \
+                .values_list("owner_id", "name", "id"):
+            group_ids[(owner_id, name.lower())] = pk
+        have = {
+            (group_id, name.lower())
+            for group_id, name in Category.objects.filter(owner_id__in=owner_ids).values_list("group_id", "name")
+        }
+
+    with transaction.atomic(using=ledger_db()):
+        new_groups = [
+            CategoryGroup(owner_id=owner_id, name=name, sort=sort)
+            for owner_id in owner_ids
+            for sort, (name, _) in enumerate(spec)
+            if (owner_id, name.lower()) not in group_ids
+        ]
+        CategoryGroup.objects.bulk_create(new_groups)
+        if any(g.pk is None for g in new_groups):  # backends without RETURNING
+            group_ids.update(
+                ((owner_id, name.lower()), pk)
+                for owner_id, name, pk in CategoryGroup.objects.filter(owner_id__in=owner_ids)
+                .values_list("owner_id", "name", "id")
+            )
+        else:
+            group_ids.update(((g.owner_id, g.name.lower()), g.pk) for g in new_groups)
+
+        new_categories = [
+            Category(owner_id=owner_id, group_id=group_ids[(owner_id, group.lower())], name=name, sort=sort)
+            for owner_id in owner_ids
+            for group, names in spec
+            for sort, name in enumerate(names)
+            if (group_ids[(owner_id, group.lower())], name.lower()) not in have
+        ]
+        Category.objects.bulk_create(new_categories)
+
+    # bulk_create skips the signals that normally invalidate cached pages
+    for owner_id in owner_ids:
+        bump_version(owner_id)
+    return len(new_groups), len(new_categories)
@@ -0,0 +1,112 @@
+import hashlib
+import time
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import router, transaction
+from django.db.models import Count, OuterRef, Subquery
+
+from .models import Account, BudgetAllocation, Category, CategoryGroup, Transaction
+
+VERSION_KEY = "tracker:version:{}:{}"
+STATS_KEY = "tracker:cache-stats:{}"
+
+
+# --- per-user data versions ---
+def data_version(user_id, scope="data"):
+    """
+    Current version of one user's ``scope`` ("data" for budget data, "payee"/"account" for name lists).
+    Versions start at a nanosecond timestamp rather than 1, so a counter that gets evicted
+    from the cache never comes back at a value already used.
+    """
+    key = VERSION_KEY.format(scope, user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(user_id, scope="data", using=None):
+    """
+    Move one user's ``scope`` version once the open transaction on ``using`` (the database
+    holding their ledger, by default) commits, or straight away outside one. Bumping earlier
+    would let a request read the old rows in between and cache them under the new version.
+    """
+    using = using or router.db_for_write(Transaction)
+    transaction.on_commit(partial(_bump, user_id, scope), using=using)
+
+
+def _bump(user_id, scope):
+    key = VERSION_KEY.format(scope, user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+# --- hit/miss counters (shared through the cache, so they cover every worker) ---
+def record(event):
+    key = STATS_KEY.format(event)
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+
+def cache_stats():
+    return {event: cache.get(STATS_KEY.format(event)) or 0 for event in ("hits", "misses")}
+
+
+def reset_cache_stats():
+    cache.delete_many([STATS_KEY.format(event) for event in ("hits", "misses")])
+
+
+# --- conditional GETs ---
+def data_fingerprint(user_id):
+    """
+    A tuple that moves with any change to the user's budget data, read from the database in
+    one query: the newest ``updated_at`` of each tracked model, plus row counts for the small
+    tables so deletes move it too. Transactions skip the count (it would scan the user's whole
+    ledger); deleting one updates its account's balance, and so the account's ``updated_at``.
+    """
+    def latest(model):
+        return Subquery(model.objects.filter(owner=OuterRef("pk")).order_by("-updated_at").values("updated_at")[:1])
+
+    def count(model):
+        return Subquery(model.objects.filter(owner=OuterRef("pk")).order_by().values("owner")
+                        .annotate(n=Count("pk")).values("n"))
+
+    fields = {"transaction_updated": latest(Transaction)}
+    for model in (Account, CategoryGroup, Category, BudgetAllocation):
+        fields[f"{model._meta.model_name}_updated"] = latest(model)
+        fields[f"{model._meta.model_name}_count"] = count(model)
+    # Read where the ledger is (the user's shard, or the replica): the subqueries join to it
+    users = User.objects.using(router.db_for_read(Transaction))
+    return users.filter(pk=user_id).annotate(**fields).values_list(*fields).first()
+
+
+def etag_for(user_id, *parts):
+    """A strong ETag for one user's view of their data: changes whenever the data fingerprint or any of ``parts`` does."""
+    raw = ":".join(str(p) for p in (user_id, data_fingerprint(user_id), *parts))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def get_or_compute(user_id, name, params, compute):
+    """
+    Return the cached value of ``compute()`` for (user, name, params) at the user's current
+    data version; any write to the user's budget data moves the version and so misses.
+    """
+    digest = hashlib.md5(str(params).encode()).hexdigest()
+    key = f"tracker:{name}:{user_id}:{data_version(user_id)}:{digest}"
+    value = cache.get(key)
+    if value is not None:
+        record("hits")
+        return value
+    record("misses")
+    value = compute()
+    cache.set(key, value, timeout=getattr(settings, "TRACKER_CACHE_TIMEOUT", 3600))
+    return value
@@ -0,0 +1,143 @@
+"""
+Compact series for the Chart.js charts: balance over time, net worth and spending by category.
+
+Daily series come from one grouped query each and are then downsampled on the server to a
+target point count, either with Largest-Triangle-Three-Buckets (keeps the visual shape) or
+bucketed min/max (keeps every extreme), so years of daily data ship as a few hundred points.
+"""
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db.models import Sum
+
+from .models import Account, Transaction
+
+DEFAULT_POINTS = 300
+MAX_POINTS = 2000
+SPENDING_SLICES = 8
+METHODS = ("lttb", "minmax")
+
+
+# --- downsampling over (x, y) pairs with numeric x ---
+def lttb(points, threshold):
+    """Largest-Triangle-Three-Buckets: keep the point per bucket that spans the largest triangle."""
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(points)
+    sampled = [points[0]]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third corner of the triangle
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, n)
+        span = avg_end - avg_start or 1
+        avg_x = sum(p[0] for p in points[avg_start:avg_end]) / span
+        avg_y = sum(p[1] for p in points[avg_start:avg_end]) / span
+
+        ax, ay = points[a]
+        best, best_area = int(i * every) + 1, -1.0
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            x, y = points[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        a = best
+    sampled.append(points[-1])
+    return sampled
+
+
+def minmax(points, threshold):
+    """Split into threshold/2 buckets and keep each bucket's lowest and highest point, in x order."""
+    n = len(points)
+    if threshold >= n or threshold < 2:
+        return list(points)
+    buckets = threshold // 2
+    size = n / buckets
+    sampled = []
+    for b in range(buckets):
+        chunk = points[int(b * size):int((b + 1) * size)]
+        if not chunk:
+            continue
+        low = min(chunk, key=lambda p: p[1])
+        high = max(chunk, key=lambda p: p[1])
+        sampled.extend(sorted({low, high}))
+    return sampled
+
+
+def downsample(points, threshold, method="lttb"):
+    return minmax(points, threshold) if method == "minmax" else lttb(points, threshold)
+
+
+# --- series ---
+def running_balance(accounts, start=None, end=None):
+    """[(date, balance)] at the end of every day with activity in ``accounts``."""
+    opening = accounts.aggregate(s=Sum("opening_balance"))["s"] or Decimal("0")
+    tx = Transaction.objects.filter(account__in=accounts)
+    if start:
+        opening += tx.filter(date__lt=start).aggregate(s=Sum("amount"))["s"] or Decimal("0")
+        tx = tx.filter(date__gte=start)
+    if end:
+        tx = tx.filter(date__lte=end)
+
+    balance = float(opening)
+    series = []
+    for day, amount in tx.values("date").annotate(s=Sum("amount")).order_by("date").values_list("date", "s"):
+        balance += float(amount or 0)
+        series.append((day, round(balance, 2)))
+    return series
+
+
+def compact(series, points, method):
+    """Downsample a [(date, value)] series and split it into the parallel arrays Chart.js takes."""
+    sampled = downsample([(d.toordinal(), v) for d, v in series], points, method)
+    return {
+        "labels": [date.fromordinal(x).isoformat() for x, _ in sampled],
+        "data": [round(y, 2) for _, y in sampled],
+        "points": len(series),
+    }
+
+
+def balance_series(user, start=None, end=None, account_id=None, points=DEFAULT_POINTS, method="lttb"):
+    accounts = Account.objects.filter(owner=user)
+    accounts = accounts.filter(id=account_id) if account_id else accounts.filter(on_budget=True)
+    return compact(running_balance(accounts, start, end), points, method)
+
+
+def net_worth_series(user, start=None, end=None, points=DEFAULT_POINTS, method="lttb"):
+    return compact(running_balance(Account.objects.filter(owner=user), start, end), points, method)
+
+
+def spending_series(user, start=None, end=None, limit=SPENDING_SLICES):
+    """Net spending per category over the range, largest first, with the tail folded into "Other"."""
+    tx = Transaction.objects.filter(owner=user, category__isnull=False)
+    if start:
+        tx = tx.filter(date__gte=start)
+    if end:
+        tx = tx.filter(date__lte=end)
+    totals = sorted(
+        ((name, -float(s)) for name, s in tx.values("category__name").annotate(s=Sum("amount"))
+         .values_list("category__name", "s").order_by() if s and s < 0),
+        key=lambda t: t[1], reverse=True,
+    )
+    head, tail = totals[:limit], totals[limit:]
+    if tail:
+        head.append(("Other", sum(v for _, v in tail)))
+    return {"labels": [name for name, _ in head], "data": [round(v, 2) for _, v in head]}
+
+
+def parse_chart_params(params):
+    """(start, end, points, method) from query parameters; bad values fall back to the defaults."""
+    def day(name):
+        try:
+            return datetime.strptime(params.get(name, ""), "%Y-%m-%d").date()
+        except ValueError:
+            return None
+
+    try:
+        points = min(max(int(params.get("points", DEFAULT_POINTS)), 3), MAX_POINTS)
+    except ValueError:
+        points = DEFAULT_POINTS
+    method = params.get("method") if params.get("method") in METHODS else "lttb"
+    return day("start"), day("end"), points, method
@@ -0,0 +1,105 @@
+"""
+Month close: freeze each category's ending ``available`` into CategoryMonthSnapshot.
+
+Closing a month starts from the newest snapshot before it and adds only the allocations and
+transactions since, so it is two range-bounded grouped queries no matter how much history the
+user has; ``rebuild_rollups`` starts from the newest snapshot the same way. Any edit that
+lands in or before a closed month reopens that month and every closed month after it (see the
+receivers in tracker/signals.py); they are closed again explicitly or when a later month is
+first opened.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .budget import first_of_month, next_month_start
+from .caching import bump_version
+from .models import BudgetAllocation, BudgetMonth, CategoryMonthSnapshot, Transaction
+from .shards import ledger_db
+
+ZERO = Decimal("0.00")
+CENT = Decimal("0.01")
+
+
+def latest_close(owner_id, before=None):
+    """The newest closed month (strictly before ``before`` when given), or None."""
+    closed = BudgetMonth.objects.filter(owner_id=owner_id, closed_at__isnull=False)
+    if before is not None:
+        closed = closed.filter(month__lt=first_of_month(before))
+    return closed.order_by("-month").values_list("month", flat=True).first()
+
+
+def snapshot(owner_id, month):
+    return dict(
+        CategoryMonthSnapshot.objects.filter(owner_id=owner_id, month=month).values_list("category_id", "available")
+    )
+
+
+def activity_between(owner_id, start, end):
+    """{category_id: budgeted + activity} for months from ``start`` (None = the beginning) up to ``end``."""
+    totals = defaultdict(lambda: ZERO)
+    allocations = BudgetAllocation.objects.filter(owner_id=owner_id, month__month__lte=end)
+    transactions = Transaction.objects.filter(owner_id=owner_id, category__isnull=False,
+                                              date__lt=next_month_start(end))
+    if start is not None:
+        allocations = allocations.filter(month__month__gte=start)
+        transactions = transactions.filter(date__gte=start)
+    for qs, field in ((allocations, "budgeted"), (transactions, "amount")):
+        for category_id, s in qs.values("category_id").annotate(s=Sum(field)).values_list("category_id", "s").order_by():
+            totals[category_id] += (s or ZERO).quantize(CENT)
+    return totals
+
+
+def carry_forward(owner_id, month):
+    """{category_id: available} at the end of ``month`` from the newest snapshot before it plus what happened since."""
+    base = latest_close(owner_id, before=month)
+    available = defaultdict(lambda: ZERO, snapshot(owner_id, base) if base else {})
+    for category_id, delta in activity_between(owner_id, next_month_start(base) if base else None, month).items():
+        available[category_id] += delta
+    return dict(available)
+
+
+def close_month(owner_id, month):
+    """Freeze ``month``'s ending balances; re-closing a month recomputes its snapshot."""
+    month = first_of_month(month)
+    with transaction.atomic(using=ledger_db()):
+        BudgetMonth.objects.get_or_create(owner_id=owner_id, month=month)
+        available = carry_forward(owner_id, month)
+        CategoryMonthSnapshot.objects.filter(owner_id=owner_id, month=month).delete()
+        CategoryMonthSnapshot.objects.bulk_create([
+            CategoryMonthSnapshot(owner_id=owner_id, category_id=category_id, month=month, available=amount)
+            for category_id, amount in available.items()
+        ])
+        BudgetMonth.objects.filter(owner_id=owner_id, month=month).update(closed_at=timezone.now())
+    return len(available)
+
+
+def close_finished_months(owner_id, before):
+    """Close, oldest first, every open month before ``before`` that has already ended."""
+    last = min(first_of_month(before), first_of_month(timezone.localdate()))
+    months = list(
+        BudgetMonth.objects.filter(owner_id=owner_id, closed_at__isnull=True, month__lt=last)
+        .order_by("month").values_list("month", flat=True)
+    )
+    for month in months:
+        close_month(owner_id, month)
+    return months
+
+
+def reopen_from(owner_id, month):
+    """
+    Reopen every closed month from ``month`` on and drop their snapshots, because an edit
+    dated ``month`` changes all of their ending balances. A no-op UPDATE when nothing is closed.
+    """
+    if month is None:
+        return 0
+    month = first_of_month(month)
+    reopened = BudgetMonth.objects.filter(owner_id=owner_id, month__gte=month, closed_at__isnull=False) \
+        .update(closed_at=None)
+    if reopened:
+        CategoryMonthSnapshot.objects.filter(owner_id=owner_id, month__gte=month).delete()
+        bump_version(owner_id)
+    return reopened
@@ -0,0 +1,59 @@
+import csv
+import json
+
+from .forms import TransactionFilterForm
+from .models import Transaction
+from .register import filter_transactions
+from .search import search_transactions
+
+EXPORT_COLUMNS = ("date", "account", "payee", "category", "memo", "amount", "cleared", "reconciled")
+CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object whose write() hands the line back, so csv.writer can feed a generator."""
+
+    def write(self, value):
+        return value
+
+
+def filtered_transactions(user, data):
+    """The user's transactions narrowed by the register's filter parameters (``data``), search included."""
+    filter_form = TransactionFilterForm(data or None, owner=user)
+    tx = Transaction.objects.filter(owner=user)
+    if filter_form.is_valid():
+        tx = filter_transactions(tx, filter_form.cleaned_data)
+        if filter_form.cleaned_data["q"]:
+            tx = search_transactions(tx, filter_form.cleaned_data["q"])
+    return tx
+
+
+def export_rows(qs):
+    """
+    Plain tuples in EXPORT_COLUMNS order, names joined in SQL and read through a
+    server-side cursor, so memory stays flat however long the history is.
+    """
+    return qs.order_by("date", "id").values_list(
+        "date", "account__name", "payee__name", "category__name", "memo", "amount", "cleared", "reconciled"
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def jsonl_lines(rows):
+    for d, account, payee, category, memo, amount, cleared, reconciled in rows:
+        yield json.dumps({
+            "date": d.isoformat(),
+            "account": account,
+            "payee": payee,
+            "category": category,
+            "memo": memo,
+            "amount": str(amount),
+            "cleared": cleared,
+            "reconciled": reconciled,
+        }) + "\n"
@@ -3,14 +3,22 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 
+from .budget_templates import DEFAULT_TEMPLATE, template_choices
 from .models import Category, CategoryGroup, Transaction, Account, Payee
 
 class SignUpForm(UserCreationForm):
     email = forms.EmailField(required=True)
+    budget_template = forms.ChoiceField(choices=template_choices, initial=DEFAULT_TEMPLATE, required=False)
+
     class Meta:
         model = User
         fields = ("username", "email", "password1", "password2")
 
+    def save(self, commit=True):
+        # Read by the post_save receiver that provisions the starter budget
+        self.instance.budget_template = self.cleaned_data.get("budget_template") or DEFAULT_TEMPLATE
+        return super().save(commit)
+
 class CategoryForm(forms.ModelForm):
     class Meta:
         model = Category
@@ -35,7 +43,8 @@ class TransactionForm(forms.ModelForm):
         help_text="Choose from list or type a new payee",
         widget=forms.TextInput(attrs={
             'list': 'payee-suggestions',
-            'autocomplete': 'off'
+            'autocomplete': 'off',
+            'data-typeahead': 'payee',
         })
     )
     account_name = forms.CharField(
@@ -43,13 +52,17 @@ class TransactionForm(forms.ModelForm):
         help_text="Choose from list or type a new account",
         widget=forms.TextInput(attrs={
             'list': 'account-suggestions',
-            'autocomplete': 'off'
+            'autocomplete': 'off',
+            'data-typeahead': 'account',
         })
     )
 
     class Meta:
         model = Transaction
         fields = ("account", "account_name", "payee", "payee_name", "category", "memo", "amount", "date", "cleared")
+        # Picked by id only when set from a suggestion; names are searched server-side instead of
+        # rendering every payee and account into the page.
+        widgets = {"account": forms.HiddenInput, "payee": forms.HiddenInput}
 
     def __init__(self, *args, **kwargs):
         owner = kwargs.pop("owner", None)
@@ -74,4 +87,43 @@ class TransactionForm(forms.ModelForm):
         if not data.get("payee") and not data.get("payee_name"):
             self.add_error("payee_name", "Choose a payee or enter a new one.")
 
-        return data
\ No newline at end of file
+        return data
+
+
+class TransactionFilterForm(forms.Form):
+    CLEARED_CHOICES = (("", "Any status"), ("yes", "Cleared"), ("no", "Pending"))
+
+    q = forms.CharField(required=False, max_length=200,
+                        widget=forms.TextInput(attrs={"placeholder": "Search memo or payee", "type": "search"}))
+    account = forms.ModelChoiceField(queryset=Account.objects.none(), required=False, empty_label="All accounts")
+    category = forms.ModelChoiceField(queryset=Category.objects.none(), required=False, empty_label="All categories")
+    payee = forms.CharField(required=False, max_length=120, widget=forms.TextInput(attrs={"placeholder": "Payee"}))
+    date_from = forms.DateField(required=False, widget=forms.DateInput(attrs={"type": "date"}))
+    date_to = forms.DateField(required=False, widget=forms.DateInput(attrs={"type": "date"}))
+    cleared = forms.ChoiceField(choices=CLEARED_CHOICES, required=False)
+    amount_min = forms.DecimalField(required=False, max_digits=12, decimal_places=2,
+                                    widget=forms.NumberInput(attrs={"placeholder": "Min amount"}))
+    amount_max = forms.DecimalField(required=False, max_digits=12, decimal_places=2,
+                                    widget=forms.NumberInput(attrs={"placeholder": "Max amount"}))
+
+    def __init__(self, *args, **kwargs):
+        owner = kwargs.pop("owner", None)
+        super().__init__(*args, **kwargs)
+        if owner:
+            self.fields["account"].queryset = Account.objects.filter(owner=owner).order_by("name")
+            self.fields["category"].queryset = Category.objects.filter(owner=owner).order_by("name")
+
+
+class StatementImportForm(forms.Form):
+    statement = forms.FileField(help_text="CSV, OFX/QFX or QIF export from your bank")
+    account_name = forms.CharField(
+        required=False,
+        help_text="Account for rows that don't name one",
+        widget=forms.TextInput(attrs={'list': 'account-suggestions', 'autocomplete': 'off', 'data-typeahead': 'account'})
+    )
+
+
+class ReconcileForm(forms.Form):
+    statement_date = forms.DateField(widget=forms.DateInput(attrs={"type": "date"}))
+    ending_balance = forms.DecimalField(max_digits=12, decimal_places=2,
+                                        help_text="The closing balance printed on the statement")
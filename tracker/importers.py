@@ -0,0 +1,267 @@
+import csv
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from .balances import apply_balance_delta
+from .caching import bump_version
+from .closing import reopen_from
+from .models import Account, Category, Payee, Transaction, transaction_fingerprint
+from .rollups import apply_delta
+from .shards import ledger_db
+from .typeahead import count_use
+
+BATCH_SIZE = 1000
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%d.%m.%Y", "%Y%m%d")
+
+
+class StatementError(ValueError):
+    pass
+
+
+def parse_date(value, line=None):
+    value = value.strip().replace("'", "/").replace(" ", "")
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise StatementError(f"Line {line}: unrecognised date {value!r}")
+
+
+def parse_amount(value, line=None):
+    try:
+        amount = Decimal(value.strip().replace(",", "").replace("$", "")).quantize(Decimal("0.01"))
+    except InvalidOperation:
+        raise StatementError(f"Line {line}: unrecognised amount {value!r}")
+    # NaN survives quantize; the database would reject it mid-import instead
+    if not amount.is_finite():
+        raise StatementError(f"Line {line}: unrecognised amount {value!r}")
+    return amount
+
+
+# --- streaming parsers: each yields dicts with date, amount, payee, memo, category, account ---
+def parse_csv(stream):
+    """
+    Header-driven CSV. Needs a date column and either amount or inflow/outflow;
+    payee (or description), memo, category and account are optional.
+    """
+    reader = csv.DictReader(stream)
+    if not reader.fieldnames:
+        return
+    reader.fieldnames = [(f or "").strip().lower() for f in reader.fieldnames]
+    for row in reader:
+        line = reader.line_num
+        if "amount" in row and row["amount"]:
+            amount = parse_amount(row["amount"], line)
+        else:
+            inflow = parse_amount(row.get("inflow") or "0", line)
+            outflow = parse_amount(row.get("outflow") or "0", line)
+            amount = inflow - outflow
+        yield {
+            "date": parse_date(row.get("date") or "", line),
+            "amount": amount,
+            "payee": (row.get("payee") or row.get("description") or "").strip(),
+            "memo": (row.get("memo") or "").strip(),
+            "category": (row.get("category") or "").strip(),
+            "account": (row.get("account") or "").strip(),
+        }
+
+
+def _ofx_tokens(stream, chunk_size=64 * 1024):
+    """Yield (TAG, value) pairs from OFX/SGML, whatever the line layout, reading in chunks."""
+    buffer = ""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        *parts, buffer = (buffer + chunk).split("<")
+        for part in parts:
+            tag, _, value = part.partition(">")
+            if tag.strip():
+                yield tag.strip().upper(), value.strip()
+    tag, _, value = buffer.partition(">")
+    if tag.strip():
+        yield tag.strip().upper(), value.strip()
+
+
+def parse_ofx(stream):
+    current = None
+    for tag, value in _ofx_tokens(stream):
+        if tag == "STMTTRN":
+            current = {}
+        elif tag == "/STMTTRN" and current is not None:
+            if "DTPOSTED" not in current or "TRNAMT" not in current:
+                raise StatementError("OFX transaction without DTPOSTED/TRNAMT")
+            yield {
+                "date": parse_date(current["DTPOSTED"][:8]),
+                "amount": parse_amount(current["TRNAMT"]),
+                "payee": current.get("NAME", ""),
+                "memo": current.get("MEMO", ""),
+                "category": "",
+                "account": "",
+            }
+            current = None
+        elif current is not None and value:
+            current[tag] = value
+
+
+def parse_qif(stream):
+    record = {}
+    for line_no, line in enumerate(stream, start=1):
+        line = line.rstrip("\r\n")
+        if not line or line.startswith("!"):
+            continue
+        code, value = line[0], line[1:].strip()
+        if code == "^":
+            if record:
+                if "date" not in record or "amount" not in record:
+                    raise StatementError(f"Line {line_no}: QIF record without date/amount")
+                yield {"payee": "", "memo": "", "category": "", "account": "", **record}
+            record = {}
+        elif code == "D":
+            record["date"] = parse_date(value, line_no)
+        elif code in "TU":
+            record["amount"] = parse_amount(value, line_no)
+        elif code == "P":
+            record["payee"] = value
+        elif code == "M":
+            record["memo"] = value
+        elif code == "L":
+            record["category"] = value
+
+
+PARSERS = {"csv": parse_csv, "ofx": parse_ofx, "qfx": parse_ofx, "qif": parse_qif}
+
+
+def detect_format(filename):
+    ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    if ext not in PARSERS:
+        raise StatementError(f"Unsupported statement format {ext!r}; use CSV, OFX or QIF")
+    return ext
+
+
+class NameCache:
+    """name -> id for one user's accounts/payees/categories, creating missing rows in bulk."""
+
+    def __init__(self, model, owner, create=True):
+        self.model = model
+        self.owner = owner
+        self.create = create
+        self.ids = {name.lower(): pk for name, pk in model.objects.filter(owner=owner).values_list("name", "id")}
+
+    def get(self, name):
+        return self.ids.get(name.lower()) if name else None
+
+    def add_missing(self, names):
+        missing = {n.lower(): n for n in names if n and n.lower() not in self.ids}
+        if not missing or not self.create:
+            return
+        created = self.model.objects.bulk_create([self.model(owner=self.owner, name=n) for n in missing.values()])
+        for obj in created:
+            if obj.pk is None:  # backends without RETURNING
+                obj.pk = self.model.objects.filter(owner=self.owner, name=obj.name).values_list("id", flat=True)[0]
+            self.ids[obj.name.lower()] = obj.pk
+        bump_version(self.owner.id, self.model._meta.model_name)
+
+
+class StatementImporter:
+    """
+    Insert parsed statement rows for one user in ``bulk_create`` batches.
+    Rows whose (account, date, amount, memo) fingerprint was already in the ledger before
+    the import are counted as duplicates and skipped; repeats within the file are kept.
+    """
+
+    def __init__(self, user, account_name=None, batch_size=BATCH_SIZE, cleared=True, progress=None):
+        self.user = user
+        self.account_name = account_name
+        self.batch_size = batch_size
+        self.cleared = cleared
+        # Called with the number of rows read so far after every batch (background jobs report it)
+        self.progress = progress
+        self.created = 0
+        self.duplicates = 0
+        self.inserted = set()
+        # Signals don't run for bulk_create, so rollups, balances and use counts are settled once at the end
+        self.activity = defaultdict(Decimal)
+        self.balances = defaultdict(Decimal)
+        self.uses = defaultdict(int)
+
+    def run(self, rows):
+        with transaction.atomic(using=ledger_db()):
+            self.accounts = NameCache(Account, self.user)
+            self.payees = NameCache(Payee, self.user)
+            self.categories = NameCache(Category, self.user, create=False)
+            if self.account_name:
+                self.accounts.add_missing({self.account_name})
+
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= self.batch_size:
+                    self.insert_batch(batch)
+                    batch = []
+            if batch:
+                self.insert_batch(batch)
+
+            for (category_id, month), amount in self.activity.items():
+                apply_delta(self.user.id, category_id, month, activity=amount)
+            for account_id, amount in self.balances.items():
+                apply_balance_delta(account_id, amount, self.cleared)
+            for (model, pk), count in self.uses.items():
+                count_use(model, pk, count)
+            reopen_from(self.user.id, min((month for _, month in self.activity), default=None))
+            bump_version(self.user.id)
+        return {"created": self.created, "duplicates": self.duplicates}
+
+    def insert_batch(self, batch):
+        self.accounts.add_missing({r["account"] for r in batch})
+        self.payees.add_missing({r["payee"] for r in batch})
+
+        objs = []
+        for r in batch:
+            account_id = self.accounts.get(r["account"]) or self.accounts.get(self.account_name)
+            if account_id is None:
+                raise StatementError("Statement row has no account; pass an account name")
+            memo = r["memo"][:200]
+            objs.append(Transaction(
+                owner=self.user,
+                account_id=account_id,
+                payee_id=self.payees.get(r["payee"]),
+                category_id=self.categories.get(r["category"]),
+                memo=memo,
+                amount=r["amount"],
+                date=r["date"],
+                cleared=self.cleared,
+                fingerprint=transaction_fingerprint(account_id, r["date"], r["amount"], memo),
+            ))
+
+        existing = set(
+            Transaction.objects.filter(
+                account_id__in={o.account_id for o in objs},
+                fingerprint__in={o.fingerprint for o in objs},
+            ).values_list("account_id", "fingerprint")
+        ) - self.inserted
+        fresh = [o for o in objs if (o.account_id, o.fingerprint) not in existing]
+        Transaction.objects.bulk_create(fresh)
+
+        for o in fresh:
+            self.inserted.add((o.account_id, o.fingerprint))
+            if o.category_id:
+                self.activity[(o.category_id, o.date.replace(day=1))] += o.amount
+            self.balances[o.account_id] += o.amount
+            self.uses[Account, o.account_id] += 1
+            self.uses[Payee, o.payee_id] += 1
+        self.created += len(fresh)
+        self.duplicates += len(objs) - len(fresh)
+        if self.progress:
+            self.progress(self.created + self.duplicates)
+
+
+def import_statement(user, stream, fmt, account_name=None, batch_size=BATCH_SIZE, progress=None):
+    """Parse a text ``stream`` in format ``fmt`` (csv/ofx/qif) and import it; see StatementImporter."""
+    if fmt not in PARSERS:
+        raise StatementError(f"Unsupported statement format {fmt!r}; use CSV, OFX or QIF")
+    return StatementImporter(user, account_name, batch_size, progress=progress).run(PARSERS[fmt](stream))
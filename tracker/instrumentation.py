@@ -0,0 +1,249 @@
+"""
+Opt-in per-request instrumentation (TRACKER_INSTRUMENTATION=1).
+
+InstrumentationMiddleware wraps every database connection with ``execute_wrapper`` for the
+length of a request and folds what it saw into in-process, lock-protected aggregates per view:
+wall/DB time histograms, query counts, SQL repeated within one request (the N+1 pattern) and
+the slowest statements. SQL is kept as the parameterised template, never with its values.
+
+Each process holds its own aggregates. They are served as-is by the staff-only endpoint, and
+flushed to TRACKER_INSTRUMENTATION_DIR every TRACKER_INSTRUMENTATION_FLUSH seconds so that
+``manage.py instrumentation_stats`` can merge every worker's numbers.
+"""
+import json
+import os
+import re
+import threading
+import time
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)  # upper bounds; one overflow bucket after
+REPEAT_THRESHOLD = 3  # the same SQL this many times in one request counts as N+1
+MAX_SIGNATURES = 20
+SLOWEST = 10
+SQL_PREVIEW = 500
+
+_IN_LIST = re.compile(r"\((?:%s, )+%s\)")
+_SPACE = re.compile(r"\s+")
+
+
+def signature(sql):
+    """Normalise SQL so the same statement with different IN-list lengths compares equal."""
+    return _SPACE.sub(" ", _IN_LIST.sub("(%s, ...)", sql)).strip()
+
+
+def bucket(ms):
+    for i, bound in enumerate(BUCKETS_MS):
+        if ms <= bound:
+            return i
+    return len(BUCKETS_MS)
+
+
+def percentile(histogram, fraction):
+    """Upper bound of the bucket holding the ``fraction`` quantile (None past the last bound)."""
+    total = sum(histogram)
+    if not total:
+        return None
+    seen = 0
+    for i, count in enumerate(histogram):
+        seen += count
+        if seen >= total * fraction:
+            return BUCKETS_MS[i] if i < len(BUCKETS_MS) else None
+    return None
+
+
+def empty_view():
+    return {
+        "requests": 0,
+        "wall_ms": 0.0,
+        "db_ms": 0.0,
+        "queries": 0,
+        "max_queries": 0,
+        "wall_histogram": [0] * (len(BUCKETS_MS) + 1),
+        "db_histogram": [0] * (len(BUCKETS_MS) + 1),
+        # signature -> [requests where it repeated, most repeats in one request]
+        "repeated": {},
+    }
+
+
+def merge_view(into, other):
+    for key in ("requests", "wall_ms", "db_ms", "queries"):
+        into[key] += other[key]
+    into["max_queries"] = max(into["max_queries"], other["max_queries"])
+    for key in ("wall_histogram", "db_histogram"):
+        into[key] = [a + b for a, b in zip(into[key], other[key])]
+    for sig, (requests, repeats) in other["repeated"].items():
+        have = into["repeated"].setdefault(sig, [0, 0])
+        have[0] += requests
+        have[1] = max(have[1], repeats)
+    if len(into["repeated"]) > MAX_SIGNATURES:
+        keep = sorted(into["repeated"].items(), key=lambda kv: (kv[1][0], kv[1][1]), reverse=True)
+        into["repeated"] = dict(keep[:MAX_SIGNATURES])
+
+
+def merge_slowest(*lists):
+    return sorted((entry for entries in lists for entry in entries), key=lambda e: e["ms"], reverse=True)[:SLOWEST]
+
+
+class QueryRecorder:
+    """An ``execute_wrapper`` that notes the SQL template and duration of each statement."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, (time.perf_counter() - started) * 1000))
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.views = {}
+            self.slowest = []
+            self.started = time.time()
+
+    def record(self, view, wall_ms, queries):
+        db_ms = sum(ms for _, ms in queries)
+        counts = {}
+        for sql, _ in queries:
+            sig = signature(sql)
+            counts[sig] = counts.get(sig, 0) + 1
+        repeated = {sig: [1, n] for sig, n in counts.items() if n >= REPEAT_THRESHOLD}
+        slow = [
+            {"ms": round(ms, 2), "view": view, "sql": sql[:SQL_PREVIEW]}
+            for sql, ms in sorted(queries, key=lambda q: q[1], reverse=True)[:SLOWEST]
+        ]
+
+        sample = empty_view()
+        sample.update(requests=1, wall_ms=wall_ms, db_ms=db_ms, queries=len(queries),
+                      max_queries=len(queries), repeated=repeated)
+        sample["wall_histogram"][bucket(wall_ms)] += 1
+        sample["db_histogram"][bucket(db_ms)] += 1
+
+        with self.lock:
+            merge_view(self.views.setdefault(view, empty_view()), sample)
+            if slow and (len(self.slowest) < SLOWEST or slow[0]["ms"] > self.slowest[-1]["ms"]):
+                self.slowest = merge_slowest(self.slowest, slow)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "pid": os.getpid(),
+                "since": self.started,
+                "buckets_ms": list(BUCKETS_MS),
+                "views": json.loads(json.dumps(self.views)),
+                "slowest": list(self.slowest),
+            }
+
+
+registry = Registry()
+
+
+def merge_snapshots(snapshots):
+    merged = {"processes": len(snapshots), "views": {}, "slowest": []}
+    for snap in snapshots:
+        for view, stats in snap["views"].items():
+            merge_view(merged["views"].setdefault(view, empty_view()), stats)
+        merged["slowest"] = merge_slowest(merged["slowest"], snap["slowest"])
+    return merged
+
+
+def summarize(stats):
+    """Averages and approximate percentiles for one view's aggregates."""
+    n = stats["requests"] or 1
+    return {
+        "requests": stats["requests"],
+        "avg_wall_ms": round(stats["wall_ms"] / n, 2),
+        "p50_wall_ms": percentile(stats["wall_histogram"], 0.5),
+        "p95_wall_ms": percentile(stats["wall_histogram"], 0.95),
+        "avg_db_ms": round(stats["db_ms"] / n, 2),
+        "avg_queries": round(stats["queries"] / n, 1),
+        "max_queries": stats["max_queries"],
+        "repeated": [
+            {"sql": sig[:SQL_PREVIEW], "requests": requests, "max_repeats": repeats}
+            for sig, (requests, repeats) in sorted(stats["repeated"].items(), key=lambda kv: kv[1], reverse=True)
+        ],
+    }
+
+
+def report(merged):
+    return {
+        "processes": merged.get("processes", 1),
+        "views": {view: summarize(stats) for view, stats in sorted(merged["views"].items())},
+        "slowest": merged["slowest"],
+    }
+
+
+# --- sharing between processes ---
+def dump_dir():
+    return Path(settings.TRACKER_INSTRUMENTATION_DIR)
+
+
+def flush():
+    """Write this process's snapshot atomically so readers never see a half-written file."""
+    directory = dump_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"instrumentation-{os.getpid()}.json"
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(registry.snapshot()))
+    os.replace(tmp, path)
+
+
+def load_dumps():
+    directory = dump_dir()
+    if not directory.is_dir():
+        return []
+    snapshots = []
+    for path in sorted(directory.glob("instrumentation-*.json")):
+        try:
+            snapshots.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue  # a worker exiting mid-rename; its next flush will be complete
+    return snapshots
+
+
+class InstrumentationMiddleware:
+    def __init__(self, get_response):
+        if not settings.TRACKER_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.flush_every = settings.TRACKER_INSTRUMENTATION_FLUSH
+        self.last_flush = time.monotonic()
+        self.flush_lock = threading.Lock()
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(recorder))
+            response = self.get_response(request)
+        wall_ms = (time.perf_counter() - started) * 1000
+
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match else "<unresolved>"
+        registry.record(view, wall_ms, recorder.queries)
+
+        if self.flush_every and time.monotonic() - self.last_flush >= self.flush_every:
+            if self.flush_lock.acquire(blocking=False):
+                try:
+                    self.last_flush = time.monotonic()
+                    flush()
+                except OSError:
+                    pass  # instrumentation must never break a request
+                finally:
+                    self.flush_lock.release()
+        return response
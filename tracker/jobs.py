@@ -0,0 +1,322 @@
+"""
+Background jobs: heavy per-user work (statement imports, rollup rebuilds, balance
+recomputation, large exports) queued in the database and run by ``manage.py run_workers``,
+so no request has to outlive the web worker's timeout and no broker is needed.
+
+* ``enqueue`` adds a Job row; views answer straight away and the page polls its progress.
+* Workers ``claim`` the oldest due job whose owner has nothing running, with one conditional
+  UPDATE. The partial unique index ``one_running_job_per_user`` makes a racing second claim
+  for the same user fail, so two jobs never change one user's ledger at once while different
+  users' jobs run side by side.
+* A job that raises is retried with exponential backoff until ``max_attempts``; exceptions
+  registered as permanent for its kind (a malformed statement) fail it at once.
+* Handlers report progress through the callable they are given. Reports are throttled and go
+  through a separate autocommit connection so pollers see them while the handler's
+  transaction is still open (SQLite allows one writer, so there they show up when it commits).
+* While a handler runs, a Heartbeat thread stamps the job every quarter of
+  TRACKER_JOB_TIMEOUT, whether or not the handler reports progress. A running job whose
+  heartbeat is older than the timeout lost its worker and is queued again; if that worker
+  turns out to be alive after all, its outcome is dropped rather than written over the new run.
+"""
+import io
+import logging
+import os
+import threading
+import time
+import traceback
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import (
+    DEFAULT_DB_ALIAS, DatabaseError, IntegrityError, close_old_connections, connection, connections, transaction,
+)
+from django.db.models import Exists, F, OuterRef
+from django.http import QueryDict
+from django.utils import timezone
+
+from .balances import recompute_balances
+from .exports import csv_lines, export_rows, filtered_transactions, jsonl_lines
+from .importers import StatementError, import_statement
+from .models import Job
+from .rollups import rebuild_rollups
+from .shards import for_user
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_INTERVAL = 1.0  # seconds between progress writes
+CLAIM_BATCH = 20  # due jobs looked at per claim; the rest belong to users with a job running
+EXPORT_FORMATS = ("csv", "jsonl")
+
+HANDLERS = {}
+
+
+def handler(kind, permanent=()):
+    """Register ``func(job, progress)`` as the runner of ``kind`` jobs; ``permanent`` exceptions aren't retried."""
+    def register(func):
+        HANDLERS[kind] = (func, tuple(permanent))
+        return func
+    return register
+
+
+def enqueue(user, kind, payload="", **params):
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind {kind!r}")
+    return Job.objects.create(owner=user, kind=kind, payload=payload, params=params,
+                              max_attempts=settings.TRACKER_JOB_MAX_ATTEMPTS)
+
+
+# --- handlers ---
+@handler("import_statement", permanent=(StatementError,))
+def run_import(job, progress):
+    result = import_statement(job.owner, io.StringIO(job.payload), job.params["format"],
+                              job.params.get("account_name"), progress=progress)
+    job.payload = ""  # in the ledger now
+    job.message = (f"Imported {result['created']} transaction(s); "
+                   f"skipped {result['duplicates']} already in your ledger.")
+    return result
+
+
+@handler("rebuild_rollups")
+def run_rebuild_rollups(job, progress):
+    count = rebuild_rollups(job.owner_id, since_close=job.params.get("since_close", False))
+    job.message = f"Rebuilt {count} monthly rollup(s)."
+    return {"rollups": count}
+
+
+@handler("recompute_balances")
+def run_recompute_balances(job, progress):
+    count = recompute_balances(job.owner_id)
+    job.message = f"Recomputed {count} account balance(s)."
+    return {"accounts": count}
+
+
+def export_path(job):
+    return Path(settings.TRACKER_JOB_DIR) / f"export-{job.pk}.{job.params.get('format', 'csv')}"
+
+
+@handler("export_transactions", permanent=(ValueError,))
+def run_export(job, progress):
+    fmt = job.params.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format {fmt!r}")
+    tx = filtered_transactions(job.owner, QueryDict(job.params.get("query", "")))
+    total = tx.count()
+
+    def counted(rows):
+        for done, row in enumerate(rows, 1):
+            progress(done, total)
+            yield row
+
+    path = export_path(job)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_suffix(".part")
+    lines = jsonl_lines if fmt == "jsonl" else csv_lines
+    with open(partial, "w", newline="", encoding="utf-8") as out:
+        out.writelines(lines(counted(export_rows(tx))))
+    # Only a complete file gets the name the download view serves
+    os.replace(partial, path)
+    job.total = total
+    job.message = f"Exported {total} transaction(s)."
+    return {"rows": total, "format": fmt}
+
+
+# --- progress ---
+def progress_connection():
+    """A private autocommit connection for progress writes, or None on SQLite (single writer)."""
+    if connection.vendor == "sqlite":
+        return None
+    return connections.create_connection(DEFAULT_DB_ALIAS)
+
+
+class Progress:
+    """
+    The ``progress(done, total=None, message="")`` callable handed to handlers. It writes at
+    most every PROGRESS_INTERVAL seconds and every write is also the job's heartbeat.
+    """
+
+    def __init__(self, job, side=None):
+        self.job = job
+        self.side = side
+        self.last = time.monotonic()
+
+    def __call__(self, done, total=None, message=""):
+        self.job.progress = done
+        if total is not None:
+            self.job.total = total
+        if message:
+            self.job.message = message[:200]
+        if time.monotonic() - self.last >= PROGRESS_INTERVAL:
+            self.write()
+
+    def write(self):
+        job = self.job
+        job.heartbeat_at = timezone.now()
+        self.last = time.monotonic()
+        if self.side is None:
+            running(job).update(progress=job.progress, total=job.total, message=job.message,
+                                heartbeat_at=job.heartbeat_at)
+            return
+        with self.side.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {Job._meta.db_table} SET progress = %s, total = %s, message = %s, heartbeat_at = %s "
+                "WHERE id = %s AND worker = %s AND status = %s",
+                [job.progress, job.total, job.message, self.side.ops.adapt_datetimefield_value(job.heartbeat_at),
+                 job.pk, job.worker, Job.RUNNING],
+            )
+
+
+class Heartbeat(threading.Thread):
+    """
+    Stamps a running job's ``heartbeat_at`` every ``interval`` seconds until stopped, on this
+    thread's own connection, so a handler that reports no progress isn't taken for dead.
+    """
+
+    def __init__(self, job, interval=None):
+        super().__init__(name=f"heartbeat-{job.pk}", daemon=True)
+        self.job = job
+        self.interval = settings.TRACKER_JOB_TIMEOUT / 4 if interval is None else interval
+        self.stopped = threading.Event()
+        self.used_db = False
+
+    def beat(self):
+        """Returns False once the job is no longer ours (requeued and claimed elsewhere, or finished)."""
+        return running(self.job).update(heartbeat_at=timezone.now()) > 0
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                self.used_db = True
+                try:
+                    if not self.beat():
+                        break
+                except DatabaseError as e:
+                    # SQLite's single writer may be busy with the handler; the next beat will do
+                    logger.warning("Heartbeat for job %s failed: %s", self.job.pk, e)
+        finally:
+            if self.used_db:
+                connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+# --- queue ---
+def running(job):
+    """``job``'s row, as long as it is still running under the worker that claimed it."""
+    return Job.objects.filter(pk=job.pk, worker=job.worker, status=Job.RUNNING)
+
+
+def requeue_stale(now=None):
+    """Queue running jobs whose worker stopped reporting again, or fail them once out of attempts."""
+    now = now or timezone.now()
+    stale = Job.objects.filter(status=Job.RUNNING,
+                               heartbeat_at__lt=now - timedelta(seconds=settings.TRACKER_JOB_TIMEOUT))
+    error = "Worker stopped responding"
+    failed = stale.filter(attempts__gte=F("max_attempts")).update(
+        status=Job.FAILED, finished_at=now, error=error, message=error)
+    requeued = stale.update(status=Job.QUEUED, run_after=now, worker="", error=error)
+    return failed + requeued
+
+
+def claim(worker):
+    """Mark the oldest due job whose owner has nothing running as taken by ``worker`` and return it, or None."""
+    now = timezone.now()
+    requeue_stale(now)
+    busy = Job.objects.filter(owner=OuterRef("owner"), status=Job.RUNNING)
+    due = Job.objects.filter(status=Job.QUEUED, run_after__lte=now).exclude(Exists(busy)) \
+        .exclude(owner__shard_assignment__read_only=True)  # being moved to another shard
+    for job_id in due.order_by("run_after", "id").values_list("id", flat=True)[:CLAIM_BATCH]:
+        try:
+            with transaction.atomic():
+                claimed = due.filter(pk=job_id).update(
+                    status=Job.RUNNING, worker=worker, attempts=F("attempts") + 1,
+                    started_at=now, heartbeat_at=now,
+                )
+        except IntegrityError:
+            # Another worker started a job for the same user between our read and our update
+            continue
+        if claimed:
+            return Job.objects.select_related("owner").get(pk=job_id)
+    return None
+
+
+def run_job(job, side=None):
+    """
+    Run a claimed job and record how it went: done, queued for a retry, or failed. Nothing is
+    recorded if the job stopped being ours meanwhile (see Heartbeat).
+    """
+    func, permanent = HANDLERS.get(job.kind, (None, ()))
+    now = timezone.now
+    heartbeat = Heartbeat(job)
+    heartbeat.start()
+    try:
+        if func is None:
+            raise LookupError(f"Unknown job kind {job.kind!r}")
+        with for_user(job.owner_id):
+            job.result = func(job, Progress(job, side))
+    except Exception as e:
+        job.error = traceback.format_exc()
+        job.message = str(e)[:200]
+        if isinstance(e, permanent) or func is None or job.attempts >= job.max_attempts:
+            job.status = Job.FAILED
+            job.finished_at = now()
+        else:
+            job.status = Job.QUEUED
+            job.run_after = now() + timedelta(seconds=settings.TRACKER_JOB_RETRY_DELAY * 2 ** (job.attempts - 1))
+        logger.warning("Job %s (%s) attempt %s failed: %s", job.pk, job.kind, job.attempts, e)
+    else:
+        job.status = Job.DONE
+        job.error = ""
+        job.finished_at = now()
+        if job.total is not None:
+            job.progress = job.total
+    finally:
+        heartbeat.stop()
+    fields = ("status", "result", "error", "message", "payload", "progress", "total", "run_after", "finished_at")
+    if not running(job).update(**{field: getattr(job, field) for field in fields}):
+        logger.warning("Job %s was handed to another worker while %s ran it; dropping this outcome",
+                       job.pk, job.worker)
+    return job
+
+
+def run_pending(worker="inline"):
+    """Run every due job in this thread, one after another; returns how many ran."""
+    count = 0
+    while (job := claim(worker)) is not None:
+        run_job(job)
+        count += 1
+    return count
+
+
+def work(name, poll=None, once=False, stop=None):
+    """
+    One worker: claim and run jobs until ``stop`` is set, sleeping ``poll`` seconds whenever
+    nothing is due (or, with ``once``, returning then). Returns how many jobs it ran.
+    """
+    poll = settings.TRACKER_JOB_POLL if poll is None else poll
+    stop = stop or threading.Event()
+    side = progress_connection()
+    count = 0
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            job = claim(name)
+            if job is None:
+                if once:
+                    break
+                stop.wait(poll)
+                continue
+            try:
+                run_job(job, side)
+            except Exception:
+                # The outcome couldn't be saved; the job goes back to the queue once its heartbeat is stale
+                logger.exception("Worker %s could not record job %s", name, job.pk)
+                connection.close()
+            count += 1
+    finally:
+        if side is not None:
+            side.close()
+        connection.close()
+    return count
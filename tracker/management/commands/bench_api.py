@@ -0,0 +1,71 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from tracker.budget import adashboard_groups, adashboard_summary, dashboard_context
+
+
+class Command(BaseCommand):
+    help = ("Compares the sync dashboard computation on a thread pool with the async API path "
+            "on one event loop, under the same number of concurrent requests.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", required=True, help="Username whose data to read")
+        parser.add_argument("--month", help="YYYY-MM (defaults to this month)")
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["user"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['user']!r}")
+        if options["month"]:
+            sel_month = datetime.strptime(options["month"], "%Y-%m").date()
+        else:
+            sel_month = date.today().replace(day=1)
+        n, concurrency = options["requests"], options["concurrency"]
+
+        dashboard_context(user, sel_month)  # warm up and make sure the BudgetMonth exists
+
+        def sync_request(_):
+            started = time.perf_counter()
+            try:
+                dashboard_context(user, sel_month)
+            finally:
+                connections.close_all()
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            sync_latencies = list(pool.map(sync_request, range(n)))
+        self.report("sync (threads)", sync_latencies, time.perf_counter() - started)
+
+        async def async_run():
+            gate = asyncio.Semaphore(concurrency)
+
+            async def one():
+                async with gate:
+                    started = time.perf_counter()
+                    await asyncio.gather(adashboard_summary(user, sel_month), adashboard_groups(user, sel_month))
+                    return time.perf_counter() - started
+
+            return await asyncio.gather(*(one() for _ in range(n)))
+
+        started = time.perf_counter()
+        async_latencies = asyncio.run(async_run())
+        self.report("async (event loop)", async_latencies, time.perf_counter() - started)
+
+    def report(self, label, latencies, wall):
+        latencies = sorted(latencies)
+        p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+        self.stdout.write(
+            f"{label:<20} {len(latencies)} req in {wall:.2f}s  {len(latencies) / wall:.1f} req/s  "
+            f"p50={statistics.median(latencies) * 1000:.1f}ms  p95={p95 * 1000:.1f}ms"
+        )
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from tracker.caching import cache_stats, reset_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Shows dashboard/register cache hit and miss counts (shared across workers when CACHES is shared)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Zero the counters after printing them.")
+
+    def handle(self, *args, **options):
+        stats = cache_stats()
+        total = stats["hits"] + stats["misses"]
+        ratio = f"{stats['hits'] / total:.1%}" if total else "n/a"
+        self.stdout.write(f"hits={stats['hits']} misses={stats['misses']} hit_ratio={ratio}")
+        if options["reset"]:
+            reset_cache_stats()
+            self.stdout.write("Counters reset.")
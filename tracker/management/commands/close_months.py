@@ -0,0 +1,43 @@
+from datetime import datetime
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from tracker.budget import first_of_month
+from tracker.closing import close_finished_months, close_month, reopen_from
+from tracker.shards import for_user
+
+
+class Command(BaseCommand):
+    help = ("Closes finished budget months, freezing each category's ending available balance so later "
+            "months carry forward from the snapshot instead of the full history.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", action="append", dest="usernames",
+                            help="Only this username (repeatable). Defaults to every user.")
+        parser.add_argument("--month", help="Close just this YYYY-MM (re-closing recomputes its snapshot)")
+        parser.add_argument("--reopen", help="Reopen this YYYY-MM and every closed month after it")
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by("id")
+        if options["usernames"]:
+            users = users.filter(username__in=options["usernames"])
+
+        try:
+            month = options["month"] and datetime.strptime(options["month"], "%Y-%m").date()
+            reopen = options["reopen"] and datetime.strptime(options["reopen"], "%Y-%m").date()
+        except ValueError:
+            raise CommandError("Months must be YYYY-MM")
+
+        for user in users:
+            with for_user(user.id):
+                if reopen:
+                    count = reopen_from(user.id, reopen)
+                    self.stdout.write(f"{user.username}: reopened {count} month(s)")
+                elif month:
+                    count = close_month(user.id, month)
+                    self.stdout.write(f"{user.username}: closed {month:%Y-%m} ({count} categories)")
+                else:
+                    closed = close_finished_months(user.id, first_of_month(timezone.localdate()))
+                    self.stdout.write(f"{user.username}: closed {len(closed)} month(s)")
@@ -0,0 +1,74 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from tracker.synthetic import BATCH_SIZE, generate_user
+
+
+def init_worker():
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = ("Generates synthetic users with realistic ledgers (paychecks, recurring bills, long-tail payees) "
+            "for load and scale testing.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1)
+        parser.add_argument("--months", type=int, default=12, help="Months of history, ending this month")
+        parser.add_argument("--tx-per-month", type=int, default=60, help="Transactions per user per month")
+        parser.add_argument("--categories", type=int,
+                            help="Categories per user; extra ones are created beyond the defaults")
+        parser.add_argument("--seed", type=int, default=0, help="Same seed, same data")
+        parser.add_argument("--prefix", default="synth", help="Usernames are <prefix>00001, <prefix>00002, ...")
+        parser.add_argument("--password", help="Password for every generated user (default: unusable)")
+        parser.add_argument("--workers", type=int, default=1,
+                            help="Generate users in this many processes (ignored on SQLite, which allows one writer)")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Rows per bulk insert")
+
+    def handle(self, *args, **options):
+        usernames = [f"{options['prefix']}{i:05d}" for i in range(1, options["users"] + 1)]
+        taken = list(User.objects.filter(username__in=usernames).values_list("username", flat=True)[:5])
+        if taken:
+            raise CommandError(f"Users already exist ({', '.join(taken)}); pick another --prefix")
+
+        kwargs = {
+            "password": options["password"],
+            "seed": options["seed"],
+            "months": options["months"],
+            "tx_per_month": options["tx_per_month"],
+            "categories": options["categories"],
+            "batch_size": options["batch_size"],
+        }
+        workers = options["workers"]
+        if workers > 1 and connection.vendor == "sqlite":
+            self.stderr.write("SQLite allows a single writer; generating users sequentially")
+            workers = 1
+
+        started = time.perf_counter()
+        total = 0
+        if workers > 1:
+            # Worker processes must open their own connections rather than inherit ours
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+                futures = [pool.submit(generate_user, name, **kwargs) for name in usernames]
+                for future in as_completed(futures):
+                    total += self.report(*future.result())
+        else:
+            for name in usernames:
+                total += self.report(*generate_user(name, **kwargs))
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Generated {len(usernames)} user(s) and {total} transaction(s) in {elapsed:.1f}s "
+            f"({total / max(elapsed, 1e-9):,.0f} rows/s)"
+        ))
+
+    def report(self, username, result):
+        self.stdout.write(f"{username}: {result['transactions']} transactions over {result['months']} months, "
+                          f"{result['payees']} payees")
+        return result["transactions"]
@@ -0,0 +1,38 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.importers import BATCH_SIZE, StatementError, detect_format, import_statement
+from tracker.shards import for_user
+
+
+class Command(BaseCommand):
+    help = "Imports a CSV/OFX/QIF bank statement for a user, skipping rows that are already in the ledger."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Statement file (.csv, .ofx/.qfx or .qif)")
+        parser.add_argument("--user", required=True, help="Username to import for")
+        parser.add_argument("--account", help="Account name for rows without an account column (created if missing)")
+        parser.add_argument("--format", choices=["csv", "ofx", "qfx", "qif"],
+                            help="Statement format; defaults to the file extension")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Rows per bulk insert")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["user"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['user']!r}")
+
+        started = time.perf_counter()
+        try:
+            fmt = options["format"] or detect_format(options["path"])
+            with open(options["path"], newline="", encoding="utf-8-sig") as stream, for_user(user.id):
+                result = import_statement(user, stream, fmt, options["account"], options["batch_size"])
+        except (OSError, StatementError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Imported {result['created']} transaction(s), skipped {result['duplicates']} duplicate(s) "
+            f"in {time.perf_counter() - started:.2f}s"
+        ))
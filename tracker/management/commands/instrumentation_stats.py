@@ -0,0 +1,42 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from tracker.instrumentation import dump_dir, load_dumps, merge_snapshots, report
+
+
+class Command(BaseCommand):
+    help = ("Merges the per-view query and latency aggregates that instrumented workers dump to "
+            "TRACKER_INSTRUMENTATION_DIR and prints them.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+        parser.add_argument("--reset", action="store_true",
+                            help="Delete the dumps after printing (running workers keep their own totals)")
+
+    def handle(self, *args, **options):
+        snapshots = load_dumps()
+        if not snapshots:
+            self.stdout.write(f"No dumps in {dump_dir()}; is TRACKER_INSTRUMENTATION=1 set on the server?")
+            return
+        data = report(merge_snapshots(snapshots))
+
+        if options["json"]:
+            self.stdout.write(json.dumps(data, indent=2))
+        else:
+            self.stdout.write(f"{data['processes']} process(es)")
+            self.stdout.write(f"{'view':<32}{'reqs':>7}{'avg ms':>9}{'p95 ms':>9}{'db ms':>9}{'queries':>9}{'max':>6}")
+            for view, s in data["views"].items():
+                p95 = s["p95_wall_ms"] if s["p95_wall_ms"] is not None else "slow"
+                self.stdout.write(f"{view:<32}{s['requests']:>7}{s['avg_wall_ms']:>9}{p95:>9}"
+                                  f"{s['avg_db_ms']:>9}{s['avg_queries']:>9}{s['max_queries']:>6}")
+                for r in s["repeated"][:3]:
+                    self.stdout.write(f"    N+1 x{r['max_repeats']} in {r['requests']} request(s): {r['sql'][:120]}")
+            self.stdout.write("Slowest statements:")
+            for q in data["slowest"]:
+                self.stdout.write(f"  {q['ms']:>8}ms  {q['view']}  {q['sql'][:120]}")
+
+        if options["reset"]:
+            for path in dump_dir().glob("instrumentation-*.json"):
+                path.unlink(missing_ok=True)
+            self.stdout.write("Dumps removed.")
@@ -0,0 +1,32 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.shards import ShardMoveError, move_user, shard_for
+
+
+class Command(BaseCommand):
+    help = ("Moves a user's ledger to another shard while they keep using the app: rows are copied live, "
+            "then writes pause for a final catch-up before the directory switches over.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("username")
+        parser.add_argument("shard", nargs="?", help="Target database alias; omit to show where the user lives")
+        parser.add_argument("--grace", type=float, default=2.0,
+                            help="Seconds to let in-flight requests finish once writes are paused")
+        parser.add_argument("--timeout", type=float, default=60.0,
+                            help="Give up if the user's running background job hasn't finished by then")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['username']!r}")
+        if not options["shard"]:
+            self.stdout.write(f"{user.username} is on {shard_for(user.pk)}")
+            return
+        try:
+            source = move_user(user, options["shard"], grace=options["grace"], timeout=options["timeout"],
+                               log=self.stdout.write)
+        except ShardMoveError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"✅ Moved {user.username} from {source} to {options['shard']}"))
@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.budget_templates import BATCH_SIZE, DEFAULT_TEMPLATE, TEMPLATES, provision_template
+from tracker.shards import residents, use_shard
+
+
+class Command(BaseCommand):
+    help = ("Provisions a starter budget template for existing users in batches. By default only users "
+            "without any category groups are backfilled; names a user already has are never duplicated.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--template", default=DEFAULT_TEMPLATE, choices=list(TEMPLATES))
+        parser.add_argument("--user", action="append", dest="usernames",
+                            help="Only this username (repeatable); adds whatever of the template is missing.")
+        parser.add_argument("--all", action="store_true",
+                            help="Every user, adding whatever of the template each one is missing.")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Users per pair of bulk inserts")
+
+    def handle(self, *args, **options):
+        if options["usernames"]:
+            found = User.objects.filter(username__in=options["usernames"]).values_list("username", flat=True)
+            missing = set(options["usernames"]) - set(found)
+            if missing:
+                raise CommandError(f"No such user(s): {', '.join(sorted(missing))}")
+
+        total_users = total_groups = total_categories = 0
+        # One shard at a time, so each batch's bulk inserts go to a single database
+        for alias in settings.TRACKER_SHARDS:
+            users = residents(alias).order_by("id")
+            if options["usernames"]:
+                users = users.filter(username__in=options["usernames"])
+            elif not options["all"]:
+                users = users.filter(categorygroup__isnull=True)
+
+            last_id = 0
+            with use_shard(alias):
+                while True:
+                    # Keyset over ids, since provisioning changes which users the backfill filter matches
+                    batch = list(users.filter(id__gt=last_id)[:options["batch_size"]])
+                    if not batch:
+                        break
+                    groups, categories = provision_template(batch, options["template"])
+                    total_users += len(batch)
+                    total_groups += groups
+                    total_categories += categories
+                    last_id = batch[-1].id
+                    self.stdout.write(f"… {total_users} user(s)")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Provisioned '{options['template']}' for {total_users} user(s): "
+            f"{total_groups} group(s), {total_categories} categor{'y' if total_categories == 1 else 'ies'}"
+        ))
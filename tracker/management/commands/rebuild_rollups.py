@@ -0,0 +1,41 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.rollups import find_drift, rebuild_rollups
+from tracker.shards import for_user
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the per-category monthly rollups from the ledger, or checks them for drift with --check."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", action="append", dest="usernames",
+                            help="Only this username (repeatable). Defaults to every user.")
+        parser.add_argument("--check", action="store_true",
+                            help="Report rollups that disagree with the ledger instead of rebuilding.")
+        parser.add_argument("--since-close", action="store_true",
+                            help="Only rebuild months after each user's newest closed month, from its snapshot.")
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by("id")
+        if options["usernames"]:
+            users = users.filter(username__in=options["usernames"])
+
+        drifted = 0
+        for user in users:
+            with for_user(user.id):
+                if options["check"]:
+                    drift = find_drift(user.id)
+                    for category_id, month, stored, expected in drift:
+                        self.stdout.write(
+                            f"{user.username}: category {category_id} {month:%Y-%m} stored={stored} expected={expected}"
+                        )
+                    drifted += bool(drift)
+                else:
+                    count = rebuild_rollups(user.id, since_close=options["since_close"])
+                    self.stdout.write(f"{user.username}: rebuilt {count} rollups")
+
+        if options["check"]:
+            if drifted:
+                raise CommandError(f"Rollups drifted for {drifted} user(s); run rebuild_rollups to fix.")
+            self.stdout.write(self.style.SUCCESS("✅ Rollups match the ledger"))
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from tracker.search import install_sqlite_search
+
+
+class Command(BaseCommand):
+    help = ("Recreates the SQLite full-text index and its triggers and refills it from the ledger, on every "
+            "shard. Postgres keeps its GIN indexes current by itself, so there is nothing to do there.")
+
+    def handle(self, *args, **options):
+        for alias in settings.TRACKER_SHARDS:
+            connection = connections[alias]
+            if connection.vendor != "sqlite":
+                self.stdout.write(f"{alias}: nothing to rebuild, the search indexes are maintained by the database")
+                continue
+            with connection.schema_editor() as schema_editor:
+                install_sqlite_search(schema_editor)
+            self.stdout.write(self.style.SUCCESS(f"✅ Rebuilt the transaction search index on {alias}"))
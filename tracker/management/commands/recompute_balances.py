@@ -0,0 +1,24 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from tracker.balances import recompute_balances
+from tracker.shards import for_user
+
+
+class Command(BaseCommand):
+    help = "Recomputes every account's cleared/uncleared balance from the ledger (one grouped query per user)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", action="append", dest="usernames",
+                            help="Only this username (repeatable). Defaults to every user.")
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by("id")
+        if options["usernames"]:
+            users = users.filter(username__in=options["usernames"])
+
+        total = 0
+        for user in users.iterator():
+            with for_user(user.id):
+                total += recompute_balances(user.id)
+        self.stdout.write(self.style.SUCCESS(f"✅ Recomputed {total} account balance(s)"))
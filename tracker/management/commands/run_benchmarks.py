@@ -0,0 +1,61 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.benchmarks import (
+    BASELINE_PATH,
+    DATASETS,
+    TOLERANCE,
+    baseline_from,
+    compare,
+    load_baseline,
+    run_benchmarks,
+)
+
+
+class Command(BaseCommand):
+    help = ("Times the dashboard, transactions, budget_allocate and categories views against generated "
+            "datasets, writes the results as JSON and fails when a view exceeds the stored baseline.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dataset", action="append", dest="datasets", choices=list(DATASETS),
+                            help="Only this dataset (repeatable). Defaults to all of them.")
+        parser.add_argument("--repeat", type=int, default=5, help="Timed runs per view")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Write the JSON report here (default: stdout)")
+        parser.add_argument("--baseline", default=str(BASELINE_PATH), help="Baseline JSON to check against")
+        parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                            help="Allowed slowdown factor over the baseline median")
+        parser.add_argument("--update-baseline", action="store_true",
+                            help="Store these results as the new baseline instead of checking them")
+
+    def handle(self, *args, **options):
+        report = run_benchmarks(options["datasets"], options["repeat"], options["seed"], log=self.stderr.write)
+
+        payload = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(payload + "\n")
+        else:
+            self.stdout.write(payload)
+
+        if options["update_baseline"]:
+            try:
+                baseline = load_baseline(options["baseline"])
+            except FileNotFoundError:
+                baseline = {}
+            baseline.update(baseline_from(report))
+            with open(options["baseline"], "w") as f:
+                json.dump(baseline, f, indent=2, sort_keys=True)
+                f.write("\n")
+            self.stderr.write(self.style.SUCCESS(f"✅ Baseline written to {options['baseline']}"))
+            return
+
+        try:
+            baseline = load_baseline(options["baseline"])
+        except FileNotFoundError:
+            raise CommandError(f"No baseline at {options['baseline']}; run with --update-baseline first")
+        failures = compare(report, baseline, options["tolerance"])
+        if failures:
+            raise CommandError("Benchmarks regressed:\n" + "\n".join(failures))
+        self.stderr.write(self.style.SUCCESS("✅ Within the baseline"))
@@ -0,0 +1,70 @@
+import os
+import signal
+import socket
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import Event
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+
+from tracker.jobs import work
+
+STOP = None
+
+
+def init_worker(stop):
+    # Ctrl-C reaches the whole process group; the parent decides when workers stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    global STOP
+    STOP = stop
+    django.setup()
+
+
+def run_worker(name, poll, once):
+    return work(name, poll, once, STOP)
+
+
+class Command(BaseCommand):
+    help = ("Runs queued background jobs (statement imports, rollup rebuilds, balance recomputes, exports) "
+            "in a pool of worker threads or processes, at most one job per user at a time.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=settings.TRACKER_JOB_WORKERS,
+                            help="Jobs run at once (ignored on SQLite, which allows one writer)")
+        parser.add_argument("--processes", action="store_true",
+                            help="Run the workers as processes instead of threads, for CPU-bound jobs")
+        parser.add_argument("--once", action="store_true", help="Exit when no job is due instead of polling")
+        parser.add_argument("--poll", type=float, default=settings.TRACKER_JOB_POLL,
+                            help="Seconds between polls while the queue is empty")
+
+    def handle(self, *args, **options):
+        workers = max(options["workers"], 1)
+        if workers > 1 and connection.vendor == "sqlite":
+            self.stderr.write("SQLite allows a single writer; running one worker")
+            workers = 1
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        names = [f"{prefix}:{i}" for i in range(1, workers + 1)]
+        poll, once = options["poll"], options["once"]
+        self.stdout.write(f"Running {workers} worker {'process' if options['processes'] else 'thread'}(s)")
+
+        if options["processes"]:
+            stop = Event()
+            # Worker processes must open their own connections rather than inherit ours
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(stop,))
+            futures = [pool.submit(run_worker, name, poll, once) for name in names]
+        else:
+            stop = threading.Event()
+            pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job-worker")
+            futures = [pool.submit(work, name, poll, once, stop) for name in names]
+        with pool:
+            try:
+                total = sum(f.result() for f in futures)
+            except KeyboardInterrupt:
+                self.stderr.write("Stopping once the running jobs finish...")
+                stop.set()
+                total = sum(f.result() for f in futures)
+        self.stdout.write(self.style.SUCCESS(f"✅ Ran {total} job(s)"))
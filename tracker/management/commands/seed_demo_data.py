@@ -12,6 +12,7 @@ from tracker.models import (
     Payee,
     Transaction,
 )
+from tracker.shards import for_user
 
 class Command(BaseCommand):
     help = "Seeds demo user, accounts, categories, and example transactions."
@@ -27,21 +28,25 @@ class Command(BaseCommand):
         else:
             self.stdout.write("ℹ️ Demo user already exists")
 
+        with for_user(user.pk):
+            self.seed(user)
+
+    def seed(self, user):
         # --- Accounts ---
         checking, _ = Account.objects.get_or_create(
             owner=user,
             name="Checking Account",
-            defaults={"on_budget": True, "balance": Decimal("2500.00")},
+            defaults={"on_budget": True, "opening_balance": Decimal("2500.00")},
         )
         savings, _ = Account.objects.get_or_create(
             owner=user,
             name="Savings",
-            defaults={"on_budget": True, "balance": Decimal("5000.00")},
+            defaults={"on_budget": True, "opening_balance": Decimal("5000.00")},
         )
         credit_card, _ = Account.objects.get_or_create(
             owner=user,
             name="Credit Card",
-            defaults={"on_budget": True, "balance": Decimal("-300.00")},
+            defaults={"on_budget": True, "opening_balance": Decimal("-300.00")},
         )
 
         # --- Category Groups + Categories ---
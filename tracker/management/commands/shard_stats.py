@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Max, Sum
+
+from tracker.models import Account, ShardAssignment, Transaction
+from tracker.shards import aggregate_across_shards, fan_out
+
+
+class Command(BaseCommand):
+    help = "Shows how users and ledger rows are spread over the shards, and totals across all of them."
+
+    def handle(self, *args, **options):
+        users = dict(ShardAssignment.objects.values_list("shard").annotate(n=Count("pk")).order_by())
+        rows = fan_out(lambda alias: Transaction.objects.using(alias).aggregate(transactions=Count("pk"),
+                                                                               latest=Max("date")))
+        for alias in settings.TRACKER_SHARDS:
+            self.stdout.write(f"{alias}: {users.get(alias, 0)} user(s), {rows[alias]['transactions']} transaction(s), "
+                              f"latest {rows[alias]['latest'] or '-'}")
+
+        totals = aggregate_across_shards(Transaction, transactions=Count("pk"), latest=Max("date"))
+        accounts = aggregate_across_shards(Account, {"on_budget": True}, accounts=Count("pk"), balance=Sum("balance"))
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {sum(users.values())} user(s), {totals['transactions']} transaction(s), "
+            f"{accounts['accounts']} on-budget account(s) holding {accounts['balance'] or 0:.2f} in total"
+        ))
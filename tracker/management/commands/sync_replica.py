@@ -0,0 +1,27 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.routers import REPLICA
+
+
+class Command(BaseCommand):
+    help = ("Copies the primary SQLite database onto the replica file, standing in for streaming "
+            "replication when trying the read replica locally with two SQLite files.")
+
+    def handle(self, *args, **options):
+        if REPLICA not in settings.DATABASES:
+            raise CommandError("No replica configured; set DATABASE_REPLICA_URL")
+        primary, replica = settings.DATABASES["default"], settings.DATABASES[REPLICA]
+        sqlite = "django.db.backends.sqlite3"
+        if primary["ENGINE"] != sqlite or replica["ENGINE"] != sqlite:
+            raise CommandError("Only SQLite files can be synced; Postgres replicas follow the primary by themselves")
+
+        source, target = sqlite3.connect(primary["NAME"]), sqlite3.connect(replica["NAME"])
+        try:
+            source.backup(target)
+        finally:
+            source.close()
+            target.close()
+        self.stdout.write(self.style.SUCCESS(f"✅ Copied {primary['NAME']} to {replica['NAME']}"))
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:33
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+
+
+def build_rollups(apps, schema_editor):
+    BudgetAllocation = apps.get_model("tracker", "BudgetAllocation")
+    Transaction = apps.get_model("tracker", "Transaction")
+    CategoryMonthRollup = apps.get_model("tracker", "CategoryMonthRollup")
+
+    totals = {}
+    allocs = BudgetAllocation.objects.values("owner_id", "category_id", "month__month") \
+        .annotate(s=Sum("budgeted")).order_by()
+    for r in allocs:
+        key = (r["owner_id"], r["category_id"], r["month__month"])
+        totals.setdefault(key, [Decimal("0.00"), Decimal("0.00")])[0] += r["s"] or 0
+    tx = Transaction.objects.filter(category__isnull=False).annotate(m=TruncMonth("date")) \
+        .values("owner_id", "category_id", "m").annotate(s=Sum("amount")).order_by()
+    for r in tx:
+        key = (r["owner_id"], r["category_id"], r["m"])
+        totals.setdefault(key, [Decimal("0.00"), Decimal("0.00")])[1] += r["s"] or 0
+
+    rows, running = [], {}
+    for (owner_id, category_id, month), (budgeted, activity) in sorted(totals.items()):
+        running[category_id] = running.get(category_id, Decimal("0.00")) + budgeted + activity
+        rows.append(CategoryMonthRollup(owner_id=owner_id, category_id=category_id, month=month,
+                                        budgeted=budgeted, activity=activity, available=running[category_id]))
+    CategoryMonthRollup.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryMonthRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='1st of month')),
+                ('budgeted', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('activity', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('available', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='tracker.category')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('owner', 'category', 'month'), name='unique_rollup_per_category_month')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
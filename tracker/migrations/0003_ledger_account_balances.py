@@ -0,0 +1,55 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:35
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Q, Sum
+
+
+def balances_from_ledger(apps, schema_editor):
+    # Until now balance was only ever the opening amount; keep it and add the ledger on top.
+    Account = apps.get_model("tracker", "Account")
+    Transaction = apps.get_model("tracker", "Transaction")
+
+    totals = {
+        r["account_id"]: r
+        for r in Transaction.objects.values("account_id").annotate(
+            cleared_sum=Sum("amount", filter=Q(cleared=True)),
+            uncleared_sum=Sum("amount", filter=Q(cleared=False)),
+        ).order_by()
+    }
+    accounts = list(Account.objects.all())
+    for account in accounts:
+        t = totals.get(account.id, {})
+        account.opening_balance = account.balance
+        account.cleared_balance = account.balance + (t.get("cleared_sum") or 0)
+        account.uncleared_balance = t.get("uncleared_sum") or Decimal("0.00")
+        account.balance = account.cleared_balance + account.uncleared_balance
+    Account.objects.bulk_update(
+        accounts, ["opening_balance", "balance", "cleared_balance", "uncleared_balance"], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0002_category_month_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='cleared_balance',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='account',
+            name='opening_balance',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='account',
+            name='uncleared_balance',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.RunPython(balances_from_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:35
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Min
+
+
+def merge_duplicate_allocations(apps, schema_editor):
+    # Racing get_or_create calls could leave several rows per (owner, month, category);
+    # keep the oldest (the one the dashboard showed) and take the rest back out of the rollups.
+    BudgetAllocation = apps.get_model("tracker", "BudgetAllocation")
+    CategoryMonthRollup = apps.get_model("tracker", "CategoryMonthRollup")
+
+    dupes = BudgetAllocation.objects.values("owner_id", "month_id", "category_id") \
+        .annotate(n=Count("id"), keep=Min("id")).filter(n__gt=1).order_by()
+    for d in dupes:
+        extra = BudgetAllocation.objects.filter(
+            owner_id=d["owner_id"], month_id=d["month_id"], category_id=d["category_id"]
+        ).exclude(id=d["keep"]).select_related("month")
+        for alloc in extra:
+            rollups = CategoryMonthRollup.objects.filter(owner_id=alloc.owner_id, category_id=alloc.category_id)
+            rollups.filter(month=alloc.month.month).update(budgeted=F("budgeted") - alloc.budgeted)
+            rollups.filter(month__gte=alloc.month.month).update(available=F("available") - alloc.budgeted)
+        extra.delete()
+
+
+# Postgres only: amount rides along in the register index for index-only sums. Backends
+# without INCLUDE keep the plain index the migration state (and the model) describe.
+REGISTER_INDEX = models.Index(fields=['owner', '-date', '-id'], name='tx_owner_date_idx')
+COVERING_REGISTER_INDEX = models.Index(fields=['owner', '-date', '-id'], include=('amount',), name='tx_owner_date_idx')
+
+
+def cover_register_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        Transaction = apps.get_model("tracker", "Transaction")
+        schema_editor.remove_index(Transaction, REGISTER_INDEX)
+        schema_editor.add_index(Transaction, COVERING_REGISTER_INDEX)
+
+
+def uncover_register_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        Transaction = apps.get_model("tracker", "Transaction")
+        schema_editor.remove_index(Transaction, COVERING_REGISTER_INDEX)
+        schema_editor.add_index(Transaction, REGISTER_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0003_ledger_account_balances'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['owner', '-date', '-id'], name='tx_owner_date_idx'),
+        ),
+        migrations.RunPython(cover_register_index, uncover_register_index),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['owner', 'category', 'date'], name='tx_owner_category_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('amount__gt', 0)), fields=['owner', 'amount'], name='tx_owner_income_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='categorymonthrollup',
+            index=models.Index(fields=['owner', 'month'], name='rollup_owner_month_idx'),
+        ),
+        migrations.RunPython(merge_duplicate_allocations, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='budgetallocation',
+            constraint=models.UniqueConstraint(fields=('owner', 'month', 'category'), name='unique_allocation_per_category_month'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:38
+
+import hashlib
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def transaction_fingerprint(account_id, date, amount, memo):
+    # Frozen copy of tracker.models.transaction_fingerprint as of this migration.
+    raw = f"{account_id}|{date.isoformat()}|{Decimal(amount).quantize(Decimal('0.01'))}|{(memo or '').strip()}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def fingerprint_existing(apps, schema_editor):
+    Transaction = apps.get_model("tracker", "Transaction")
+    batch = []
+    for tx in Transaction.objects.only("account_id", "date", "amount", "memo").iterator(chunk_size=2000):
+        tx.fingerprint = transaction_fingerprint(tx.account_id, tx.date, tx.amount, tx.memo)
+        batch.append(tx)
+        if len(batch) >= 2000:
+            Transaction.objects.bulk_update(batch, ["fingerprint"])
+            batch = []
+    Transaction.objects.bulk_update(batch, ["fingerprint"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0004_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=40),
+        ),
+        migrations.RunPython(fingerprint_existing, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['account', 'fingerprint'], name='tx_account_fingerprint_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0005_transaction_fingerprint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payee',
+            index=models.Index(fields=['owner', 'name'], name='payee_owner_name_idx'),
+        ),
+    ]
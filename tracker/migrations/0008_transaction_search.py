@@ -0,0 +1,89 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Frozen copy of the schema in tracker/search.py as of this migration.
+FTS_TABLE = "tracker_transaction_fts"
+PAYEE_NAME = "COALESCE((SELECT name FROM tracker_payee WHERE id = new.payee_id), '')"
+
+SQLITE_SCHEMA = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(memo, payee)",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON tracker_transaction BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, memo, payee) VALUES (new.id, new.memo, {PAYEE_NAME});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF memo, payee_id ON tracker_transaction BEGIN
+        UPDATE {FTS_TABLE} SET memo = new.memo, payee = {PAYEE_NAME} WHERE rowid = new.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON tracker_transaction BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_payee_rename AFTER UPDATE OF name ON tracker_payee BEGIN
+        UPDATE {FTS_TABLE} SET payee = new.name
+        WHERE rowid IN (SELECT id FROM tracker_transaction WHERE payee_id = new.id);
+    END""",
+    f"""INSERT INTO {FTS_TABLE}(rowid, memo, payee)
+        SELECT t.id, t.memo, COALESCE(p.name, '') FROM tracker_transaction t
+        LEFT JOIN tracker_payee p ON p.id = t.payee_id""",
+]
+SQLITE_DROP = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{name}" for name in ("insert", "update", "delete", "payee_rename")
+] + [f"DROP TABLE IF EXISTS {FTS_TABLE}"]
+
+POSTGRES_INDEXES = (("Transaction", "memo", "tx_memo_search_idx"), ("Payee", "name", "payee_name_search_idx"))
+
+
+class FullTextDocumentField(models.TextField):
+    """Frozen stand-in for tracker.models.FullTextDocumentField (the FTS5 hidden column)."""
+
+
+def postgres_search_indexes(apps):
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+
+    for model_name, field, name in POSTGRES_INDEXES:
+        yield apps.get_model("tracker", model_name), GinIndex(SearchVector(field, config="simple"), name=name)
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        for sql in SQLITE_SCHEMA:
+            schema_editor.execute(sql)
+    elif schema_editor.connection.vendor == "postgresql":
+        for model, index in postgres_search_indexes(apps):
+            schema_editor.add_index(model, index)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        for sql in SQLITE_DROP:
+            schema_editor.execute(sql)
+    elif schema_editor.connection.vendor == "postgresql":
+        for model, index in postgres_search_indexes(apps):
+            schema_editor.remove_index(model, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0007_month_close_snapshots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransactionSearch',
+            fields=[
+                ('transaction', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='tracker.transaction')),
+                ('memo', models.TextField()),
+                ('payee', models.TextField()),
+                ('document', FullTextDocumentField(db_column='tracker_transaction_fts')),
+                ('rank', models.FloatField(db_column='rank')),
+            ],
+            options={
+                'db_table': 'tracker_transaction_fts',
+                'managed': False,
+            },
+        ),
+        # The FTS5 table and its triggers on SQLite, GIN tsvector indexes on Postgres
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Frozen copy of the search triggers from 0008_transaction_search.
+FTS_TABLE = "tracker_transaction_fts"
+PAYEE_NAME = "COALESCE((SELECT name FROM tracker_payee WHERE id = new.payee_id), '')"
+TRIGGERS = {
+    "insert": f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON tracker_transaction BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, memo, payee) VALUES (new.id, new.memo, {PAYEE_NAME});
+    END""",
+    "update": f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF memo, payee_id ON tracker_transaction BEGIN
+        UPDATE {FTS_TABLE} SET memo = new.memo, payee = {PAYEE_NAME} WHERE rowid = new.id;
+    END""",
+    "delete": f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON tracker_transaction BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END""",
+    "payee_rename": f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_payee_rename AFTER UPDATE OF name ON tracker_payee BEGIN
+        UPDATE {FTS_TABLE} SET payee = new.name
+        WHERE rowid IN (SELECT id FROM tracker_transaction WHERE payee_id = new.id);
+    END""",
+}
+
+
+def pause_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        for name in TRIGGERS:
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{name}")
+
+
+def resume_search_triggers(apps, schema_editor):
+    # The rebuild only copies rows, so the index is still current once the triggers are back.
+    if schema_editor.connection.vendor == "sqlite":
+        for sql in TRIGGERS.values():
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0008_transaction_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # SQLite rebuilds the transaction table to add the column, which the search triggers trip over
+        migrations.RunPython(pause_search_triggers, resume_search_triggers),
+        migrations.AddField(
+            model_name='account',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='budgetallocation',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='categorygroup',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['owner', '-updated_at'], name='tx_owner_updated_idx'),
+        ),
+        migrations.RunPython(resume_search_triggers, pause_search_triggers),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, migrations, models
+
+
+def assign_existing_users(apps, schema_editor):
+    """Everyone who predates sharding keeps their ledger on "default"; the directory says so."""
+    if schema_editor.connection.alias != DEFAULT_DB_ALIAS:
+        return
+    User = apps.get_model("auth", "User")
+    ShardAssignment = apps.get_model("tracker", "ShardAssignment")
+    ShardAssignment.objects.bulk_create(
+        [ShardAssignment(user_id=pk, shard=DEFAULT_DB_ALIAS) for pk in User.objects.values_list("pk", flat=True)],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('tracker', '0010_background_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShardAssignment',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='shard_assignment', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('shard', models.CharField(max_length=40)),
+                ('read_only', models.BooleanField(default=False)),
+                ('moved_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['shard'], name='shard_assignment_shard_idx')],
+            },
+        ),
+        migrations.RunPython(assign_existing_users, migrations.RunPython.noop),
+    ]
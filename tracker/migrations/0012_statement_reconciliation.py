@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0011_shard_directory'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Reconciliation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('statement_date', models.DateField()),
+                ('ending_balance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('transaction_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('reconciled', False)), fields=['account', 'date'], name='tx_account_unreconciled_idx'),
+        ),
+        migrations.AddField(
+            model_name='reconciliation',
+            name='account',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reconciliations', to='tracker.account'),
+        ),
+        migrations.AddField(
+            model_name='reconciliation',
+            name='owner',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='reconciliation',
+            index=models.Index(fields=['account', '-statement_date'], name='reconciliation_account_idx'),
+        ),
+    ]
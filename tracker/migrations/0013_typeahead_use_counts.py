@@ -0,0 +1,74 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:17
+
+from django.db import migrations, models
+from django.db.models import Count
+
+# Frozen copy of the search triggers from 0008_transaction_search, as in 0009.
+FTS_TABLE = "tracker_transaction_fts"
+PAYEE_NAME = "COALESCE((SELECT name FROM tracker_payee WHERE id = new.payee_id), '')"
+TRIGGERS = {
+    "insert": f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON tracker_transaction BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, memo, payee) VALUES (new.id, new.memo, {PAYEE_NAME});
+    END""",
+    "update": f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF memo, payee_id ON tracker_transaction BEGIN
+        UPDATE {FTS_TABLE} SET memo = new.memo, payee = {PAYEE_NAME} WHERE rowid = new.id;
+    END""",
+    "delete": f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON tracker_transaction BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END""",
+    "payee_rename": f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_payee_rename AFTER UPDATE OF name ON tracker_payee BEGIN
+        UPDATE {FTS_TABLE} SET payee = new.name
+        WHERE rowid IN (SELECT id FROM tracker_transaction WHERE payee_id = new.id);
+    END""",
+}
+
+
+def pause_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        for name in TRIGGERS:
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{name}")
+
+
+def resume_search_triggers(apps, schema_editor):
+    # The rebuild only copies rows, so the index is still current once the triggers are back.
+    if schema_editor.connection.vendor == "sqlite":
+        for sql in TRIGGERS.values():
+            schema_editor.execute(sql)
+
+
+def uses_from_ledger(apps, schema_editor):
+    Transaction = apps.get_model("tracker", "Transaction")
+    for model_name, field in (("Account", "account_id"), ("Payee", "payee_id")):
+        model = apps.get_model("tracker", model_name)
+        counts = dict(
+            Transaction.objects.filter(**{f"{field}__isnull": False})
+            .values(field).annotate(n=Count("pk")).values_list(field, "n").order_by()
+        )
+        rows = list(model.objects.filter(pk__in=counts).only("pk"))
+        for row in rows:
+            row.uses = counts[row.pk]
+        model.objects.bulk_update(rows, ["uses"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0012_statement_reconciliation'),
+    ]
+
+    operations = [
+        # SQLite rebuilds both tables to add the column, which the search triggers trip over
+        migrations.RunPython(pause_search_triggers, resume_search_triggers),
+        migrations.AddField(
+            model_name='account',
+            name='uses',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='payee',
+            name='uses',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(resume_search_triggers, pause_search_triggers),
+        migrations.RunPython(uses_from_ledger, migrations.RunPython.noop),
+    ]
@@ -1,81 +1,40 @@
+import hashlib
+
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils.timezone import now
 from decimal import Decimal
 
-# tracker/signals.py
-from django.db.models.signals import post_save
-from django.dispatch import receiver
-from django.contrib.auth.models import User
-
-
-@receiver(post_save, sender=User)
-def create_default_categories(sender, instance, created, **kwargs):
-    if created:
-        # Default Category Groups
-        groups_data = [
-            {"name": "Bills", "sort": 0},
-            {"name": "Needs", "sort": 1},
-            {"name": "Wants", "sort": 2},
-            {"name": "Future Planning", "sort": 3},
-        ]
-
-        for group_data in groups_data:
-            group = CategoryGroup.objects.create(
-                owner=instance,
-                name=group_data["name"],
-                sort=group_data["sort"]
-            )
-
-            # Default Categories for each group
-            if group.name == "Needs":
-                categories = [
-                    {"name": "Rent/Mortgage", "sort": 0},
-                    {"name": "Utilities", "sort": 1},
-                    {"name": "Groceries", "sort": 2},
-                    {"name": "Transportation", "sort": 3},
-                ]
-            elif group.name == "Bills":
-                categories = [
-                    {"name": "Insurance", "sort": 0},
-                    {"name": "Healthcare", "sort": 1},
-                    {"name": "Household Supplies", "sort": 2},
-                ]
-            elif group.name == "Wants":
-                categories = [
-                    {"name": "Dining Out", "sort": 0},
-                    {"name": "Entertainment", "sort": 1},
-                    {"name": "Personal Care", "sort": 2},
-                ]
-            else:  # Future Planning
-                categories = [
-                    {"name": "Emergency Fund", "sort": 0},
-                    {"name": "Retirement", "sort": 1},
-                    {"name": "Investments", "sort": 2},
-                ]
-
-            for cat_data in categories:
-                Category.objects.create(
-                    owner=instance,
-                    group=group,
-                    name=cat_data["name"],
-                    sort=cat_data["sort"]
-                )
-
 class Account(models.Model):
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
     name = models.CharField(max_length=80)
     on_budget = models.BooleanField(default=True)  # checking, savings, credit card
+    opening_balance = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+    # Running totals kept in step with the ledger by tracker/signals.py; balance = cleared + uncleared
     balance = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+    cleared_balance = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+    uncleared_balance = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+    # Transactions filed under it, kept in step by tracker/signals.py; ranks typeahead suggestions
+    uses = models.IntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Also moved by balance updates, so a deleted transaction still shows up in the data fingerprint
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            # A new account has no transactions yet, only its opening balance (counted as cleared)
+            self.balance = self.cleared_balance = self.opening_balance
+            self.uncleared_balance = Decimal("0.00")
+        super().save(*args, **kwargs)
+
 class CategoryGroup(models.Model):
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
     name = models.CharField(max_length=80)
     sort = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -86,6 +45,7 @@ class Category(models.Model):
     name = models.CharField(max_length=80)
     sort = models.PositiveIntegerField(default=0)
     hidden = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -93,6 +53,8 @@ class Category(models.Model):
 class BudgetMonth(models.Model):
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
     month = models.DateField(help_text="Use 1st of month, e.g., 2025-11-01")
+    # Set when the month's ending balances are frozen into CategoryMonthSnapshot (tracker/closing.py)
+    closed_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return self.month.strftime("%B")
@@ -110,16 +72,38 @@ class BudgetAllocation(models.Model):
     month = models.ForeignKey(BudgetMonth, on_delete=models.CASCADE, related_name="allocations")
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
     budgeted = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+    updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["owner", "month", "category"],
+                name="unique_allocation_per_category_month",
+            )
+        ]
 
 
 class Payee(models.Model):
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
     name = models.CharField(max_length=120)
+    # Transactions paid to it, kept in step by tracker/signals.py; ranks typeahead suggestions
+    uses = models.IntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.name
 
+    class Meta:
+        indexes = [
+            # Prefix lookups (name__startswith) and name -> id resolution per user
+            models.Index(fields=["owner", "name"], name="payee_owner_name_idx"),
+        ]
+
+def transaction_fingerprint(account_id, date, amount, memo):
+    """Stable hash of (account, date, amount, memo) used to spot re-imported statement rows."""
+    raw = f"{account_id}|{date.isoformat()}|{Decimal(amount).quantize(Decimal('0.01'))}|{(memo or '').strip()}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
 class Transaction(models.Model):
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
     account = models.ForeignKey(Account, on_delete=models.CASCADE)
@@ -131,6 +115,207 @@ class Transaction(models.Model):
     cleared = models.BooleanField(default=False)
     reconciled = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    fingerprint = models.CharField(max_length=40, blank=True, editable=False)
+
+    def __str__(self):
+        return self.memo
+
+    def save(self, *args, **kwargs):
+        self.fingerprint = transaction_fingerprint(
+            self.account_id, self._meta.get_field("date").to_python(self.date), self.amount, self.memo
+        )
+        super().save(*args, **kwargs)
+
+    class Meta:
+        indexes = [
+            # Register ordering and month ranges. Migration 0004 adds INCLUDE (amount) on Postgres
+            # only, for index-only sums; SQLite has no covering indexes.
+            models.Index(fields=["owner", "-date", "-id"], name="tx_owner_date_idx"),
+            # Category history (rollup rebuilds, category filters)
+            models.Index(fields=["owner", "category", "date"], name="tx_owner_category_date_idx"),
+            # Lifetime income for To Be Budgeted
+            models.Index(fields=["owner", "amount"], condition=models.Q(amount__gt=0), name="tx_owner_income_idx"),
+            # Duplicate detection on import
+            models.Index(fields=["account", "fingerprint"], name="tx_account_fingerprint_idx"),
+            # Newest change per user for conditional GETs (tracker/caching.py data_fingerprint)
+            models.Index(fields=["owner", "-updated_at"], name="tx_owner_updated_idx"),
+            # What the next statement can cover (tracker/reconciliation.py); reconciled rows drop out
+            models.Index(fields=["account", "date"], condition=models.Q(reconciled=False),
+                         name="tx_account_unreconciled_idx"),
+        ]
+
+class FullTextMatch(models.Lookup):
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", [*lhs_params, *rhs_params]
+
+
+class FullTextDocumentField(models.TextField):
+    """The FTS5 hidden column named after its table; ``__match`` runs a full-text query against every column."""
+
+
+FullTextDocumentField.register_lookup(FullTextMatch)
+
+
+class TransactionSearch(models.Model):
+    """
+    Memo and payee name of every transaction in an SQLite FTS5 table, kept in sync by the
+    triggers in tracker/search.py. Read-only and SQLite-only: Postgres searches GIN-indexed
+    tsvectors on the transaction and payee tables instead.
+    """
+    transaction = models.OneToOneField(Transaction, primary_key=True, db_column="rowid",
+                                       on_delete=models.DO_NOTHING, related_name="search_entry")
+    memo = models.TextField()
+    payee = models.TextField()
+    document = FullTextDocumentField(db_column="tracker_transaction_fts")
+    rank = models.FloatField(db_column="rank")  # bm25: lower is a better match
+
+    class Meta:
+        managed = False
+        db_table = "tracker_transaction_fts"
+
+
+class CategoryMonthRollup(models.Model):
+    """
+    Per-category monthly totals, kept current by the signals in tracker/signals.py.
+    ``available`` is cumulative: everything budgeted minus spent up to the end of ``month``.
+    """
+    owner = models.ForeignKey(User, on_delete=models.CASCADE)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name="rollups")
+    month = models.DateField(help_text="1st of month")
+    budgeted = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+    activity = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+    available = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+
+    def __str__(self):
+        return f"{self.category} {self.month:%Y-%m}"
+
+    @property
+    def carried_in(self):
+        return self.available - self.budgeted - self.activity
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["owner", "category", "month"],
+                name="unique_rollup_per_category_month",
+            )
+        ]
+        indexes = [
+            models.Index(fields=["owner", "month"], name="rollup_owner_month_idx"),
+        ]
+
+
+class CategoryMonthSnapshot(models.Model):
+    """
+    A category's ``available`` at the end of a closed month, computed from the ledger and frozen.
+    Later months carry forward from the newest snapshot instead of summing the whole history.
+    """
+    owner = models.ForeignKey(User, on_delete=models.CASCADE)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name="snapshots")
+    month = models.DateField(help_text="1st of the closed month")
+    available = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+
+    def __str__(self):
+        return f"{self.category} {self.month:%Y-%m} closed at {self.available}"
+
+    class Meta:
+        constraints = [
+            # (owner, month) leads so a whole month's snapshot is one index range
+            models.UniqueConstraint(
+                fields=["owner", "month", "category"],
+                name="unique_snapshot_per_category_month",
+            )
+        ]
+
+
+class Reconciliation(models.Model):
+    """
+    A bank statement an account was checked against (tracker/reconciliation.py). The
+    transactions it covered are reconciled and locked; ``ending_balance`` was the account's
+    cleared balance once they were.
+    """
+    owner = models.ForeignKey(User, on_delete=models.CASCADE)
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name="reconciliations")
+    statement_date = models.DateField()
+    ending_balance = models.DecimalField(max_digits=12, decimal_places=2)
+    transaction_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return self.memo
\ No newline at end of file
+        return f"{self.account} to {self.statement_date} at {self.ending_balance}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["account", "-statement_date"], name="reconciliation_account_idx"),
+        ]
+
+
+class Job(models.Model):
+    """
+    A unit of heavy per-user work (statement import, rollup rebuild, export...) queued in the
+    database and run by ``manage.py run_workers``; see tracker/jobs.py. At most one job per
+    user is running at a time.
+    """
+    QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+    STATUS_CHOICES = [(QUEUED, "Queued"), (RUNNING, "Running"), (DONE, "Done"), (FAILED, "Failed")]
+
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="jobs")
+    kind = models.CharField(max_length=40)
+    params = models.JSONField(default=dict, blank=True)
+    payload = models.TextField(blank=True)  # uploaded statement text, cleared once imported
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=now)
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    message = models.CharField(max_length=200, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=80, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Moved by progress reports; a running job that stops moving it is handed to another worker
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+    class Meta:
+        constraints = [
+            # Per-user serialization: a second claim for the same user fails instead of running
+            models.UniqueConstraint(fields=["owner"], condition=models.Q(status="running"),
+                                    name="one_running_job_per_user"),
+        ]
+        indexes = [
+            # Workers polling for due jobs
+            models.Index(fields=["status", "run_after"], name="job_status_run_after_idx"),
+            # A user's recent jobs
+            models.Index(fields=["owner", "-created_at"], name="job_owner_created_idx"),
+        ]
+
+
+class ShardAssignment(models.Model):
+    """
+    Directory entry: which database holds a user's ledger (tracker/shards.py). Lives on
+    "default" with the users; ``read_only`` is set while the user is being moved.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="shard_assignment")
+    shard = models.CharField(max_length=40)
+    read_only = models.BooleanField(default=False)
+    moved_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user_id} on {self.shard}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["shard"], name="shard_assignment_shard_idx"),
+        ]
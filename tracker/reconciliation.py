@@ -0,0 +1,112 @@
+"""
+Statement reconciliation: check an account against a bank statement, then lock what it covered.
+
+Nothing here reads the account's history. The cleared balance is the running total kept on
+Account (tracker/signals.py), and the only transactions looked at are the unreconciled ones,
+found through the partial index ``tx_account_unreconciled_idx``; reconciled rows drop out of
+it. The work is proportional to what happened since the last statement, however many years
+the account goes back.
+
+Confirming marks the chosen pending transactions, and every cleared one not yet reconciled,
+cleared and reconciled in a single UPDATE. From then on the receivers in tracker/signals.py
+refuse to change their amount, date, account or status, or to delete them; memo, payee and
+category stay editable since they don't move the balance.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .caching import bump_version
+from .models import Account, Reconciliation, Transaction
+from .shards import ledger_db
+
+ZERO = Decimal("0.00")
+LOCKED_FIELDS = ("account_id", "amount", "date", "cleared", "reconciled")
+
+
+class ReconciliationError(Exception):
+    pass
+
+
+class LockedTransactionError(Exception):
+    pass
+
+
+def unreconciled(account):
+    return Transaction.objects.filter(owner_id=account.owner_id, account=account, reconciled=False)
+
+
+def pending(account):
+    """The account's uncleared transactions, oldest first: what a statement can newly show."""
+    return unreconciled(account).filter(cleared=False).order_by("date", "id")
+
+
+def propose(account, statement_date, ending_balance):
+    """
+    What the statement most likely covers: every pending transaction dated on or before it.
+    When the difference left is exactly one pending transaction (a cheque not cashed yet, a
+    charge that posted early), that one is left out or taken in, nearest the statement first.
+    """
+    rows = list(pending(account).select_related("payee", "category"))
+    proposed = {t.pk for t in rows if t.date <= statement_date}
+    cleared_balance = account.cleared_balance
+    difference = ending_balance - cleared_balance - sum((t.amount for t in rows if t.pk in proposed), ZERO)
+    if difference:
+        for t in sorted(rows, key=lambda t: abs((t.date - statement_date).days)):
+            if (-t.amount if t.pk in proposed else t.amount) == difference:
+                proposed ^= {t.pk}
+                difference = ZERO
+                break
+    return {
+        "cleared_balance": cleared_balance,
+        "pending": rows,
+        "proposed": proposed,
+        "difference": difference,
+        # Already cleared, so locked along with the chosen ones
+        "cleared_count": unreconciled(account).filter(cleared=True).count(),
+    }
+
+
+def reconcile(account, statement_date, ending_balance, transaction_ids):
+    """
+    Confirm a statement. ``transaction_ids`` are the pending transactions it shows; with them,
+    the cleared balance has to come to ``ending_balance``. Returns the Reconciliation.
+    """
+    ids = set(transaction_ids)
+    with transaction.atomic(using=ledger_db()):
+        # Holds off balance updates from concurrent edits until we're done
+        account = Account.objects.select_for_update().get(pk=account.pk)
+        chosen = pending(account).filter(pk__in=ids).aggregate(n=Count("pk"), total=Sum("amount"))
+        if chosen["n"] != len(ids):
+            raise ReconciliationError("Some of the chosen transactions aren't pending in this account any more.")
+        total = chosen["total"] or ZERO
+        if account.cleared_balance + total != ending_balance:
+            raise ReconciliationError(
+                f"The cleared balance would be {account.cleared_balance + total} but the statement says "
+                f"{ending_balance}; difference {ending_balance - account.cleared_balance - total}."
+            )
+        now = timezone.now()
+        count = unreconciled(account).filter(Q(cleared=True) | Q(pk__in=ids)) \
+            .update(cleared=True, reconciled=True, updated_at=now)
+        Account.objects.filter(pk=account.pk).update(cleared_balance=F("cleared_balance") + total,
+                                                     uncleared_balance=F("uncleared_balance") - total,
+                                                     updated_at=now)
+        reconciliation = Reconciliation.objects.create(owner_id=account.owner_id, account=account,
+                                                       statement_date=statement_date,
+                                                       ending_balance=ending_balance, transaction_count=count)
+    bump_version(account.owner_id)
+    return reconciliation
+
+
+def locked_changes(old, instance):
+    """The balance-affecting fields a save would change on a reconciled transaction."""
+    new = {
+        "account_id": instance.account_id,
+        "amount": Decimal(str(instance.amount)),
+        "date": Transaction._meta.get_field("date").to_python(instance.date),
+        "cleared": instance.cleared,
+        "reconciled": instance.reconciled,
+    }
+    return [field for field in LOCKED_FIELDS if old[field] != new[field]]
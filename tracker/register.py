@@ -0,0 +1,83 @@
+from datetime import date
+
+from django.db.models import Q
+
+PAGE_SIZE = 50
+
+
+# --- keyset cursors on (date, id) ---
+def encode_cursor(tx):
+    return f"{tx.date.isoformat()}.{tx.id}"
+
+
+def decode_cursor(value):
+    if not value:
+        return None
+    try:
+        d, pk = value.split(".")
+        return date.fromisoformat(d), int(pk)
+    except ValueError:
+        return None
+
+
+def filter_transactions(qs, filters):
+    """Apply cleaned TransactionFilterForm data to a Transaction queryset."""
+    if filters.get("account"):
+        qs = qs.filter(account=filters["account"])
+    if filters.get("category"):
+        qs = qs.filter(category=filters["category"])
+    if filters.get("payee"):
+        qs = qs.filter(payee__name__istartswith=filters["payee"])
+    if filters.get("date_from"):
+        qs = qs.filter(date__gte=filters["date_from"])
+    if filters.get("date_to"):
+        qs = qs.filter(date__lte=filters["date_to"])
+    if filters.get("cleared") == "yes":
+        qs = qs.filter(cleared=True)
+    elif filters.get("cleared") == "no":
+        qs = qs.filter(cleared=False)
+    if filters.get("amount_min") is not None:
+        qs = qs.filter(amount__gte=filters["amount_min"])
+    if filters.get("amount_max") is not None:
+        qs = qs.filter(amount__lte=filters["amount_max"])
+    return qs
+
+
+def keyset_query(qs, after=None, before=None, size=None):
+    """The LIMIT query for one page: seeks past a (date, id) cursor instead of using OFFSET."""
+    size = size or PAGE_SIZE
+    if before:
+        d, pk = before
+        return qs.filter(Q(date__gte=d) & (Q(date__gt=d) | Q(id__gt=pk))).order_by("date", "id")[:size + 1]
+    if after:
+        d, pk = after
+        qs = qs.filter(Q(date__lte=d) & (Q(date__lt=d) | Q(id__lt=pk)))
+    return qs.order_by("-date", "-id")[:size + 1]
+
+
+def keyset_result(rows, after=None, before=None, size=None):
+    size = size or PAGE_SIZE
+    if before:
+        has_newer, has_older = len(rows) > size, True
+        rows = rows[:size][::-1]
+    else:
+        has_newer, has_older = after is not None, len(rows) > size
+        rows = rows[:size]
+
+    newer = encode_cursor(rows[0]) if rows and has_newer else None
+    older = encode_cursor(rows[-1]) if rows and has_older else None
+    return rows, newer, older
+
+
+def keyset_page(qs, after=None, before=None, size=None):
+    """
+    One page of ``qs`` newest-first. ``after`` pages towards older rows, ``before`` back towards newer ones.
+    Returns (rows, newer_cursor, older_cursor); a cursor is None when there is nothing that way.
+    """
+    rows = list(keyset_query(qs, after, before, size))
+    return keyset_result(rows, after, before, size)
+
+
+async def akeyset_page(qs, after=None, before=None, size=None):
+    rows = [tx async for tx in keyset_query(qs, after, before, size)]
+    return keyset_result(rows, after, before, size)
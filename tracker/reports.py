@@ -0,0 +1,155 @@
+"""
+Spending trend reports over 1-60 months.
+
+One grouped query returns the inflow and outflow for every (category, month) in the range.
+Those sums are laid into a category x month matrix of integer cents (``array('q')`` rows),
+and totals, rolling averages and month-over-month deltas are computed row by row over the
+arrays. Nothing loops over months in the ORM, so five years cost the same query as one.
+"""
+import asyncio
+from array import array
+from datetime import datetime
+from decimal import Decimal
+
+from django.db.models import Q, Sum
+from django.db.models.functions import TruncMonth
+
+from .budget import alist, months_ending, next_month_start
+from .models import Category, CategoryGroup, Transaction
+
+DEFAULT_MONTHS = 12
+MAX_MONTHS = 60
+DEFAULT_WINDOW = 3
+
+
+def cents(value):
+    return int(round((value or 0) * 100))
+
+
+def to_money(value):
+    return Decimal(int(round(value))).scaleb(-2)
+
+
+# --- query builders ---
+def trend_queryset(user, months):
+    return (
+        Transaction.objects.filter(owner=user, date__gte=months[0], date__lt=next_month_start(months[-1]))
+        .annotate(m=TruncMonth("date"))
+        .values("category_id", "m")
+        .annotate(inflow=Sum("amount", filter=Q(amount__gt=0)), outflow=Sum("amount", filter=Q(amount__lt=0)))
+        .order_by()
+    )
+
+
+def categories_values(user):
+    return Category.objects.filter(owner=user).order_by("sort", "name").values("id", "name", "group_id", "hidden")
+
+
+def groups_values(user):
+    return CategoryGroup.objects.filter(owner=user).order_by("sort", "name").values("id", "name")
+
+
+# --- array maths ---
+def zeros(n):
+    return array("q", bytes(8 * n))
+
+
+def rolling_average(row, window):
+    """Trailing mean over up to ``window`` months, from a prefix sum so each point is O(1)."""
+    prefix = array("q", [0])
+    for v in row:
+        prefix.append(prefix[-1] + v)
+    return [(prefix[i + 1] - prefix[max(0, i + 1 - window)]) / min(i + 1, window) for i in range(len(row))]
+
+
+def series(row, window):
+    total = sum(row)
+    return {
+        "spending": [to_money(v) for v in row],
+        "total": to_money(total),
+        "average": to_money(total / len(row)) if row else to_money(0),
+        "rolling": [to_money(v) for v in rolling_average(row, window)],
+        "delta": [None] + [to_money(row[i] - row[i - 1]) for i in range(1, len(row))],
+    }
+
+
+def build_trends(rows, categories, groups, months, window=DEFAULT_WINDOW):
+    """Fold the grouped rows into the matrix and derive the per-category, per-group and overall series."""
+    n = len(months)
+    col = {m: i for i, m in enumerate(months)}
+    matrix = {}
+    income, outflow = zeros(n), zeros(n)
+
+    for r in rows:
+        month = r["m"].date() if isinstance(r["m"], datetime) else r["m"]
+        i = col[month]
+        inflow, out = cents(r["inflow"]), cents(r["outflow"])
+        income[i] += inflow
+        outflow[i] -= out
+        if r["category_id"] is not None:
+            if r["category_id"] not in matrix:
+                matrix[r["category_id"]] = zeros(n)
+            # Spending is shown positive; refunds into a category reduce it
+            matrix[r["category_id"]][i] -= inflow + out
+
+    by_group = {}
+    for c in categories:
+        if c["hidden"] and c["id"] not in matrix:
+            continue
+        by_group.setdefault(c["group_id"], []).append(c)
+
+    report_groups = []
+    spending = zeros(n)
+    for g in groups:
+        members = by_group.get(g["id"], [])
+        if not members:
+            continue
+        group_row = zeros(n)
+        rows_out = []
+        for c in members:
+            row = matrix.get(c["id"]) or zeros(n)
+            for i in range(n):
+                group_row[i] += row[i]
+            rows_out.append({"id": c["id"], "name": c["name"], **series(row, window)})
+        for i in range(n):
+            spending[i] += group_row[i]
+        report_groups.append({"id": g["id"], "name": g["name"], **series(group_row, window), "categories": rows_out})
+
+    net = array("q", (income[i] - outflow[i] for i in range(n)))
+    return {
+        "months": [m.strftime("%Y-%m") for m in months],
+        "window": window,
+        "groups": report_groups,
+        "spending": series(spending, window),
+        "income": [to_money(v) for v in income],
+        "outflow": [to_money(v) for v in outflow],
+        "net": [to_money(v) for v in net],
+        "total_income": to_money(sum(income)),
+        "total_outflow": to_money(sum(outflow)),
+    }
+
+
+# --- entry points ---
+def trend_report(user, end, months=DEFAULT_MONTHS, window=DEFAULT_WINDOW):
+    span = months_ending(end, months)
+    return build_trends(list(trend_queryset(user, span)), list(categories_values(user)),
+                        list(groups_values(user)), span, window)
+
+
+async def atrend_report(user, end, months=DEFAULT_MONTHS, window=DEFAULT_WINDOW):
+    span = months_ending(end, months)
+    rows, categories, groups = await asyncio.gather(
+        alist(trend_queryset(user, span)), alist(categories_values(user)), alist(groups_values(user)),
+    )
+    return build_trends(rows, categories, groups, span, window)
+
+
+def parse_trend_params(params):
+    """(months, window) from query parameters, clamped to what the report supports."""
+    def number(name, default, low, high):
+        try:
+            return min(max(int(params.get(name, default)), low), high)
+        except (TypeError, ValueError):
+            return default
+
+    return number("months", DEFAULT_MONTHS, 1, MAX_MONTHS), number("window", DEFAULT_WINDOW, 1, 12)
@@ -0,0 +1,145 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import TruncMonth
+
+from .budget import next_month_start
+from .caching import bump_version
+from .closing import latest_close, snapshot
+from .models import BudgetAllocation, Category, CategoryMonthRollup, Transaction
+from .shards import ledger_db
+
+ZERO = Decimal("0.00")
+CENT = Decimal("0.01")
+
+
+def apply_delta(owner_id, category_id, month, budgeted=ZERO, activity=ZERO):
+    """
+    Fold a change of ``budgeted``/``activity`` for one category-month into the rollups.
+    The month's own row moves by the delta, and so does ``available`` on every later row.
+    """
+    if category_id is None or (not budgeted and not activity):
+        return
+    month = month.replace(day=1)
+    rollups = CategoryMonthRollup.objects.filter(owner_id=owner_id, category_id=category_id)
+
+    with transaction.atomic(using=ledger_db()):
+        if not rollups.filter(month=month).exists():
+            carried = rollups.filter(month__lt=month).order_by("-month") \
+                          .values_list("available", flat=True).first() or ZERO
+            CategoryMonthRollup.objects.get_or_create(
+                owner_id=owner_id, category_id=category_id, month=month,
+                defaults={"available": carried},
+            )
+        rollups.filter(month=month).update(
+            budgeted=F("budgeted") + budgeted,
+            activity=F("activity") + activity,
+        )
+        rollups.filter(month__gte=month).update(available=F("available") + budgeted + activity)
+
+
+def apply_month_deltas(owner_id, month, deltas, field="budgeted"):
+    """
+    Like apply_delta for many categories in one month ({category_id: delta} on ``field``),
+    in a fixed number of statements however many categories change.
+    """
+    deltas = {c: d for c, d in deltas.items() if c is not None and d}
+    if not deltas:
+        return
+    month = month.replace(day=1)
+    rollups = CategoryMonthRollup.objects.filter(owner_id=owner_id, category_id__in=deltas)
+
+    with transaction.atomic(using=ledger_db()):
+        missing = set(deltas) - set(rollups.filter(month=month).values_list("category_id", flat=True))
+        if missing:
+            carried = CategoryMonthRollup.objects.filter(
+                owner_id=owner_id, category_id=OuterRef("pk"), month__lt=month
+            ).order_by("-month").values("available")[:1]
+            CategoryMonthRollup.objects.bulk_create([
+                CategoryMonthRollup(owner_id=owner_id, category_id=category_id, month=month, available=available or ZERO)
+                for category_id, available in Category.objects.filter(id__in=missing)
+                .annotate(carried=Subquery(carried)).values_list("id", "carried")
+            ], ignore_conflicts=True)
+
+        delta = Case(
+            *[When(category_id=c, then=Value(d)) for c, d in deltas.items()],
+            default=Value(ZERO),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        )
+        rollups.filter(month=month).update(**{field: F(field) + delta})
+        rollups.filter(month__gte=month).update(available=F("available") + delta)
+
+
+def compute_rollups(owner_id, after=None, opening=None):
+    """
+    Recompute rollups for a user from the ledger: {(category_id, month): (budgeted, activity, available)}.
+    With ``after`` only months after it are computed, starting from the ``opening`` available per category.
+    """
+    totals = defaultdict(lambda: [ZERO, ZERO])
+
+    allocs = BudgetAllocation.objects.filter(owner_id=owner_id)
+    tx = Transaction.objects.filter(owner_id=owner_id, category__isnull=False)
+    if after is not None:
+        allocs = allocs.filter(month__month__gt=after)
+        tx = tx.filter(date__gte=next_month_start(after))
+
+    allocs = allocs.values("category_id", "month__month").annotate(s=Sum("budgeted")).order_by()
+    for r in allocs:
+        totals[(r["category_id"], r["month__month"])][0] += (r["s"] or ZERO).quantize(CENT)
+
+    tx = tx.annotate(m=TruncMonth("date")).values("category_id", "m").annotate(s=Sum("amount")).order_by()
+    for r in tx:
+        # SQLite sums decimals as floats, so round back to cents before comparing with stored rows
+        totals[(r["category_id"], r["m"])][1] += (r["s"] or ZERO).quantize(CENT)
+
+    result = {}
+    running = defaultdict(lambda: ZERO, opening or {})
+    for (category_id, month), (budgeted, activity) in sorted(totals.items()):
+        running[category_id] += budgeted + activity
+        result[(category_id, month)] = (budgeted, activity, running[category_id])
+    return result
+
+
+def rebuild_rollups(owner_id, since_close=False):
+    """
+    Rebuild a user's rollups from the ledger. With ``since_close`` only the months after the
+    newest closed month are rebuilt, carried forward from its snapshot instead of the full history.
+    """
+    after = latest_close(owner_id) if since_close else None
+    opening = snapshot(owner_id, after) if after else None
+    rows = [
+        CategoryMonthRollup(owner_id=owner_id, category_id=category_id, month=month,
+                            budgeted=budgeted, activity=activity, available=available)
+        for (category_id, month), (budgeted, activity, available) in compute_rollups(owner_id, after, opening).items()
+    ]
+    with transaction.atomic(using=ledger_db()):
+        stale = CategoryMonthRollup.objects.filter(owner_id=owner_id)
+        if after:
+            stale = stale.filter(month__gt=after)
+        stale.delete()
+        CategoryMonthRollup.objects.bulk_create(rows, batch_size=1000)
+    bump_version(owner_id)
+    return len(rows)
+
+
+def find_drift(owner_id):
+    """Return [(category_id, month, stored, expected)] wherever the stored rollups disagree with the ledger."""
+    expected = compute_rollups(owner_id)
+    stored = {
+        (r.category_id, r.month): (r.budgeted, r.activity, r.available)
+        for r in CategoryMonthRollup.objects.filter(owner_id=owner_id)
+    }
+    drift = []
+    carried = defaultdict(lambda: ZERO)
+    for key in sorted(set(expected) | set(stored)):
+        want = expected.get(key)
+        have = stored.get(key)
+        if want is None:
+            # A month whose entries were all removed keeps a zero row that just carries the balance forward
+            want = (ZERO, ZERO, carried[key[0]])
+        carried[key[0]] = want[2]
+        if want != have:
+            drift.append((key[0], key[1], have, want))
+    return drift
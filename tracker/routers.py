@@ -0,0 +1,165 @@
+"""
+Primary/replica routing.
+
+Writes, and every read by default, go to "default". Views that only read (dashboard
+aggregates, reports, charts, exports) are wrapped in ``replica_reads`` and send their
+queries to the "replica" alias when one is configured (DATABASE_REPLICA_URL). Two things
+keep a user reading their own writes despite replication lag:
+
+* reads inside a transaction on the primary stay there, so a read-only view that opens a
+  month or rebuilds something reads what it is about to write;
+* ReplicaPinningMiddleware keeps write requests on the primary and pins the user there for
+  TRACKER_REPLICA_STICKY_SECONDS afterwards, through a cookie (this browser) and a cache
+  key (their other sessions, when the cache is shared between workers).
+
+ShardRouter comes first: it sends ledger models to the current user's shard when that is not
+"default" (see tracker/shards.py) and otherwise leaves the choice to PrimaryReplicaRouter.
+"""
+from contextvars import ContextVar
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import HttpResponse
+
+from .shards import current, directory_entry, is_sharded, shard_for, sharding_enabled, use_shard
+
+REPLICA = "replica"
+PIN_COOKIE = "tracker_primary"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS", "TRACE")
+
+_replica_reads = ContextVar("tracker_replica_reads", default=False)
+_pinned = ContextVar("tracker_pinned", default=False)
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+def pin_key(user_id):
+    return f"tracker:pin:{user_id}"
+
+
+def replica_reads(view):
+    """Let ``view``'s reads use the replica; works for sync and async views."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            token = _replica_reads.set(True)
+            try:
+                return await view(*args, **kwargs)
+            finally:
+                _replica_reads.reset(token)
+    else:
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            token = _replica_reads.set(True)
+            try:
+                return view(*args, **kwargs)
+            finally:
+                _replica_reads.reset(token)
+    return wrapper
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (
+            _replica_reads.get()
+            and not _pinned.get()
+            and replica_configured()
+            and not connections["default"].in_atomic_block
+        ):
+            return REPLICA
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema from the primary, not from migrate
+        return db == "default"
+
+
+class ReplicaPinningMiddleware:
+    def __init__(self, get_response):
+        if not replica_configured():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sticky = settings.TRACKER_REPLICA_STICKY_SECONDS
+
+    def __call__(self, request):
+        user_id = request.user.pk if request.user.is_authenticated else None
+        pinned = (
+            request.method not in SAFE_METHODS
+            or PIN_COOKIE in request.COOKIES
+            or (user_id is not None and cache.get(pin_key(user_id)) is not None)
+        )
+        token = _pinned.set(pinned)
+        try:
+            response = self.get_response(request)
+        finally:
+            _pinned.reset(token)
+
+        if request.method not in SAFE_METHODS:
+            response.set_cookie(PIN_COOKIE, "1", max_age=self.sticky, httponly=True, samesite="Lax")
+            # The view may have logged someone in or out, so look the user up again
+            if request.user.is_authenticated:
+                cache.set(pin_key(request.user.pk), 1, timeout=self.sticky)
+        return response
+
+
+class ShardRouter:
+    def shard(self, model, hints):
+        if not sharding_enabled() or not is_sharded(model):
+            return None
+        instance = hints.get("instance")
+        alias = current()
+        if instance is not None and instance._state.db in settings.TRACKER_SHARDS and is_sharded(instance):
+            # Related objects of a ledger row live beside it
+            alias = instance._state.db
+        elif alias is None and isinstance(instance, User):
+            # Assigning an owner, or following a user's reverse relations, outside any shard context
+            alias = shard_for(instance.pk)
+        # "default" is PrimaryReplicaRouter's to decide, replica included
+        return alias if alias != DEFAULT_DB_ALIAS else None
+
+    def db_for_read(self, model, **hints):
+        return self.shard(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self.shard(model, hints)
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Shards get the whole schema, auth included, for their residents' user rows
+        if db != DEFAULT_DB_ALIAS and db in settings.TRACKER_SHARDS:
+            return True
+        return None
+
+
+class ShardMiddleware:
+    """Routes the signed-in user's ledger queries to their shard; refuses writes while they are being moved."""
+
+    def __init__(self, get_response):
+        if not sharding_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not request.user.is_authenticated:
+            return self.get_response(request)
+        alias, read_only = directory_entry(request.user.pk)
+        if read_only and request.method not in SAFE_METHODS:
+            response = HttpResponse("Your data is being moved; try again in a moment.", status=503,
+                                    content_type="text/plain")
+            response["Retry-After"] = "5"
+            return response
+        with use_shard(alias):
+            return self.get_response(request)
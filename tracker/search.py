@@ -0,0 +1,119 @@
+"""
+Full-text search over transaction memos and payee names.
+
+SQLite keeps an FTS5 table (TransactionSearch) in step with tracker_transaction and
+tracker_payee through triggers, so bulk_create imports and generated ledgers are indexed
+too. Postgres uses GIN indexes on ``to_tsvector('simple', ...)`` of the memo and the payee
+name. Either way a search is an index lookup joined back to the (already filtered)
+transaction queryset, ranked, and paged with LIMIT/OFFSET.
+
+Every word in the query must match, each as a prefix ("chip" finds "Chipotle").
+
+Migrations that make SQLite rebuild tracker_transaction or tracker_payee (most AddField and
+AlterField operations) must drop the search triggers before those operations and recreate
+them afterwards, with their own copy of the SQL (see 0009_updated_at_tracking): the rebuild
+drops the table's own triggers and trips over the ones on the other table that refer to it.
+``manage.py rebuild_search_index`` repairs a database that missed them.
+"""
+import re
+
+from django.db import connection
+from django.db.models import F, Q
+
+from .register import PAGE_SIZE
+
+FTS_TABLE = "tracker_transaction_fts"
+PAYEE_NAME = "COALESCE((SELECT name FROM tracker_payee WHERE id = new.payee_id), '')"
+
+SQLITE_SCHEMA = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(memo, payee)",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON tracker_transaction BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, memo, payee) VALUES (new.id, new.memo, {PAYEE_NAME});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF memo, payee_id ON tracker_transaction BEGIN
+        UPDATE {FTS_TABLE} SET memo = new.memo, payee = {PAYEE_NAME} WHERE rowid = new.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON tracker_transaction BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_payee_rename AFTER UPDATE OF name ON tracker_payee BEGIN
+        UPDATE {FTS_TABLE} SET payee = new.name
+        WHERE rowid IN (SELECT id FROM tracker_transaction WHERE payee_id = new.id);
+    END""",
+]
+SQLITE_REBUILD = [
+    f"DELETE FROM {FTS_TABLE}",
+    f"""INSERT INTO {FTS_TABLE}(rowid, memo, payee)
+        SELECT t.id, t.memo, COALESCE(p.name, '') FROM tracker_transaction t
+        LEFT JOIN tracker_payee p ON p.id = t.payee_id""",
+]
+
+
+def words(text):
+    return re.findall(r"\w+", (text or "").lower())
+
+
+def fts5_query(terms):
+    return " ".join(f'"{t}"*' for t in terms)
+
+
+def tsquery(terms):
+    return " & ".join(f"'{t}':*" for t in terms)
+
+
+# --- schema (called from rebuild_search_index; migrations keep their own copy) ---
+def install_sqlite_search(schema_editor):
+    for sql in SQLITE_SCHEMA + SQLITE_REBUILD:
+        schema_editor.execute(sql)
+
+
+# --- queries ---
+def search_transactions(qs, text):
+    """
+    ``qs`` narrowed to transactions whose memo or payee matches every word of ``text``, annotated
+    with ``rank`` (higher is better) and ordered best match first, newest first among equals.
+    """
+    terms = words(text)
+    if not terms:
+        return qs.none()
+    if connection.vendor == "postgresql":
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+        from .models import Payee
+
+        query = SearchQuery(tsquery(terms), config="simple", search_type="raw")
+        payees = Payee.objects.annotate(document=SearchVector("name", config="simple")).filter(document=query)
+        qs = qs.annotate(document=SearchVector("memo", config="simple")) \
+            .filter(Q(document=query) | Q(payee__in=payees.values("id"))) \
+            .annotate(rank=SearchRank(SearchVector("memo", "payee__name", config="simple"), query))
+    else:
+        qs = qs.filter(search_entry__document__match=fts5_query(terms)).annotate(rank=-F("search_entry__rank"))
+    return qs.order_by("-rank", "-date", "-id")
+
+
+def search_query(qs, text, page=1, size=None):
+    size = size or PAGE_SIZE
+    start = (page - 1) * size
+    return search_transactions(qs, text)[start:start + size + 1]
+
+
+def search_result(rows, size=None):
+    """(rows, has_more) from a page fetched one row long."""
+    size = size or PAGE_SIZE
+    return rows[:size], len(rows) > size
+
+
+def search_page(qs, text, page=1, size=None):
+    """One ranked page (1-based) of ``qs`` matching ``text``: (rows, has_more)."""
+    return search_result(list(search_query(qs, text, page, size)), size)
+
+
+async def asearch_page(qs, text, page=1, size=None):
+    return search_result([tx async for tx in search_query(qs, text, page, size)], size)
+
+
+def parse_page(value):
+    try:
+        return max(int(value), 1)
+    except (TypeError, ValueError):
+        return 1
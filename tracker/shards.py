@@ -0,0 +1,368 @@
+"""
+Owner-based sharding.
+
+Every ledger row belongs to one user (``owner``), so a user's accounts, categories, budget
+and transactions live together on one of the databases listed in TRACKER_SHARDS ("default"
+first, then one per DATABASE_SHARD_URLS entry). Users, sessions, the shard directory and the
+job queue stay on "default".
+
+* Placement: a new user goes where a consistent-hash ring puts their id, and the choice is
+  written to the directory (ShardAssignment), which every later lookup reads. Adding a shard
+  therefore only changes where new users land; ``manage.py move_user_shard`` moves others.
+* Routing: ShardMiddleware looks the signed-in user up once per request, and ShardRouter
+  (tracker/routers.py) sends their ledger queries to that shard. Commands and jobs wrap
+  per-user work in ``for_user``. Ledger transactions use ``atomic(using=ledger_db())``.
+* Each shard keeps a copy of its residents' auth_user rows, so foreign keys hold there.
+* Shard n hands out ledger ids from ``n * SHARD_ID_SPAN`` up, so ids never collide across
+  shards and a moved user's rows keep theirs.
+* ``fan_out`` and ``aggregate_across_shards`` run admin-level queries on every shard.
+
+With a single database all of this stays out of the way: no directory lookups, no routing.
+"""
+import bisect
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+from functools import lru_cache
+from itertools import islice
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connection, connections, router, transaction
+from django.db.models import Count, Max, Min, Sum
+from django.utils import timezone
+
+from .caching import bump_version
+from .models import Job, ShardAssignment
+
+SHARD_ID_SPAN = 10 ** 12
+RING_REPLICAS = 64  # points per shard on the hash ring, to even out the split
+COPY_BATCH = 1000
+CATCH_UP_PASSES = 2
+CLOCK_MARGIN = timedelta(seconds=60)  # updated_at is stamped before commit, and by more than one clock
+
+# Parents before children: the order a user's rows are copied in (and deleted in reverse)
+LEDGER_MODELS = ("Account", "CategoryGroup", "Category", "Payee", "BudgetMonth", "BudgetAllocation",
+                 "Transaction", "CategoryMonthRollup", "CategoryMonthSnapshot", "Reconciliation")
+UNSHARDED = {"job", "shardassignment"}
+
+_current = ContextVar("tracker_shard", default=None)
+
+
+class ShardMoveError(Exception):
+    pass
+
+
+def sharding_enabled():
+    return len(settings.TRACKER_SHARDS) > 1
+
+
+def is_sharded(model):
+    return model._meta.app_label == "tracker" and model._meta.model_name not in UNSHARDED
+
+
+def ledger_models():
+    return [apps.get_model("tracker", name) for name in LEDGER_MODELS]
+
+
+# --- shard map: consistent hash ring plus the directory ---
+def hash_key(value):
+    return int.from_bytes(hashlib.md5(str(value).encode()).digest()[:8], "big")
+
+
+class HashRing:
+    """Consistent hashing: adding a shard only takes over the keys that fall on its new points."""
+
+    def __init__(self, nodes, replicas=RING_REPLICAS):
+        points = sorted((hash_key(f"{node}:{i}"), node) for node in nodes for i in range(replicas))
+        self.keys = [key for key, _ in points]
+        self.nodes = [node for _, node in points]
+
+    def node_for(self, key):
+        return self.nodes[bisect.bisect(self.keys, hash_key(key)) % len(self.keys)]
+
+
+@lru_cache(maxsize=8)
+def ring(shards):
+    return HashRing(shards)
+
+
+def placement(user_id):
+    """Where the ring puts a new user."""
+    return ring(tuple(settings.TRACKER_SHARDS)).node_for(user_id)
+
+
+def directory_entry(user_id):
+    """(shard, read_only) for a user: their directory entry, else their place on the ring."""
+    if not sharding_enabled():
+        return DEFAULT_DB_ALIAS, False
+    entry = ShardAssignment.objects.using(DEFAULT_DB_ALIAS).filter(pk=user_id) \
+        .values_list("shard", "read_only").first()
+    return entry or (placement(user_id), False)
+
+
+def shard_for(user_id):
+    return directory_entry(user_id)[0]
+
+
+def place_user(user):
+    """Record a new user's shard and give it a copy of their auth_user row; returns the alias."""
+    alias = placement(user.pk) if sharding_enabled() else DEFAULT_DB_ALIAS
+    ShardAssignment.objects.using(DEFAULT_DB_ALIAS).create(user_id=user.pk, shard=alias)
+    if alias != DEFAULT_DB_ALIAS:
+        mirror_user(user, alias)
+    return alias
+
+
+def residents(alias):
+    """The users whose ledger lives on ``alias``, queried on that database."""
+    if not sharding_enabled():
+        return User.objects.all()
+    if alias == DEFAULT_DB_ALIAS:
+        return User.objects.using(alias).filter(shard_assignment__shard=alias)
+    return User.objects.using(alias).all()
+
+
+# --- routing context ---
+@contextmanager
+def use_shard(alias):
+    """Route ledger queries made in this block (and the asyncio tasks it starts) to ``alias``."""
+    token = _current.set(alias)
+    try:
+        yield alias
+    finally:
+        _current.reset(token)
+
+
+def for_user(user_id):
+    """Route ledger queries to ``user_id``'s shard (for work outside a request: commands, jobs)."""
+    return use_shard(shard_for(user_id))
+
+
+def current():
+    return _current.get()
+
+
+def ledger_db():
+    """Alias holding the current user's ledger, for ``transaction.atomic(using=...)``."""
+    return router.db_for_write(apps.get_model("tracker", "Transaction"))
+
+
+# --- fan-out ---
+def fan_out(func, aliases=None):
+    """
+    ``func(alias)`` on every shard, in parallel threads (one after another on SQLite);
+    returns {alias: result}.
+    """
+    aliases = list(aliases or settings.TRACKER_SHARDS)
+    if len(aliases) == 1 or connection.vendor == "sqlite":
+        return {alias: func(alias) for alias in aliases}
+
+    def call(alias):
+        try:
+            return func(alias)
+        finally:
+            # Connections are per thread; don't leave this one open
+            connections[alias].close()
+
+    with ThreadPoolExecutor(max_workers=len(aliases), thread_name_prefix="shard") as pool:
+        return dict(zip(aliases, pool.map(call, aliases)))
+
+
+COMBINE = {Count: sum, Sum: sum, Min: min, Max: max}
+
+
+def aggregate_across_shards(model, filters=None, **aggregates):
+    """
+    ``model.objects.filter(**filters).aggregate(**aggregates)`` on every shard, combined into
+    one dict. Only Count, Sum, Min and Max combine (an average of averages would be wrong).
+    """
+    for name, aggregate in aggregates.items():
+        if type(aggregate) not in COMBINE:
+            raise ValueError(f"{name}: only Count, Sum, Min and Max can be combined across shards")
+    per_shard = fan_out(lambda alias: model._base_manager.using(alias).filter(**(filters or {}))
+                        .aggregate(**aggregates))
+    combined = {}
+    for name, aggregate in aggregates.items():
+        values = [result[name] for result in per_shard.values() if result[name] is not None]
+        combined[name] = COMBINE[type(aggregate)](values) if values else (0 if isinstance(aggregate, Count) else None)
+    return combined
+
+
+# --- raw row copies ---
+def insert_rows(model, objs, alias):
+    """INSERT ``objs`` into ``alias`` as they are: ids kept, no signals, auto_now left alone (as loaddata does)."""
+    fields = model._meta.concrete_fields
+    size = max(min(connections[alias].ops.bulk_batch_size(fields, objs), COPY_BATCH), 1)
+    for start in range(0, len(objs), size):
+        model._base_manager._insert(objs[start:start + size], fields=fields, using=alias, raw=True)
+
+
+def delete_rows(model, alias, pks):
+    table = connections[alias].ops.quote_name(model._meta.db_table)
+    pks = list(pks)
+    with connections[alias].cursor() as cursor:
+        for start in range(0, len(pks), COPY_BATCH):
+            batch = pks[start:start + COPY_BATCH]
+            cursor.execute(f"DELETE FROM {table} WHERE id IN ({', '.join(['%s'] * len(batch))})", batch)
+
+
+def mirror_user(user, alias):
+    if not User.objects.using(alias).filter(pk=user.pk).exists():
+        insert_rows(User, [user], alias)
+
+
+def clear_user(alias, user_id):
+    """Delete a user's ledger rows (and, off "default", their user row) from ``alias`` without signals."""
+    conn = connections[alias]
+    with transaction.atomic(using=alias), conn.cursor() as cursor:
+        for model in reversed(ledger_models()):
+            cursor.execute(f"DELETE FROM {conn.ops.quote_name(model._meta.db_table)} WHERE owner_id = %s", [user_id])
+        if alias != DEFAULT_DB_ALIAS:
+            cursor.execute(f"DELETE FROM {conn.ops.quote_name(User._meta.db_table)} WHERE id = %s", [user_id])
+
+
+def reserve_id_range(alias):
+    """Start ``alias``'s ledger ids in its own range (run after migrate)."""
+    if alias not in settings.TRACKER_SHARDS:
+        return
+    start = settings.TRACKER_SHARDS.index(alias) * SHARD_ID_SPAN
+    if not start:
+        return
+    conn = connections[alias]
+    with conn.cursor() as cursor:
+        for model in ledger_models():
+            table = model._meta.db_table
+            if conn.vendor == "sqlite":
+                cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = %s", [table])
+                row = cursor.fetchone()
+                if row is None:
+                    cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)", [table, start])
+                elif row[0] < start:
+                    cursor.execute("UPDATE sqlite_sequence SET seq = %s WHERE name = %s", [start, table])
+            elif conn.vendor == "postgresql":
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+                    f"GREATEST(%s, (SELECT COALESCE(MAX(id), 0) FROM {conn.ops.quote_name(table)})))",
+                    [table, start],
+                )
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def has_updated_at(model):
+    return any(f.name == "updated_at" for f in model._meta.concrete_fields)
+
+
+def copy_changes(model, owner_id, source, target, since=None):
+    """
+    Insert or update ``target``'s copy of one user's ``model`` rows to match ``source``. With
+    ``since``, models that track updated_at only look at rows changed after it; the others are
+    always compared in full (they are small: payees, months, rollups, snapshots).
+    """
+    rows = model._base_manager.using(source).filter(owner_id=owner_id)
+    if since is not None and has_updated_at(model):
+        rows = rows.filter(updated_at__gte=since)
+    fields = [f for f in model._meta.concrete_fields if not f.primary_key]
+
+    def values(obj):
+        return [getattr(obj, f.attname) for f in fields]
+
+    copied = 0
+    for batch in batched(rows.order_by("pk").iterator(chunk_size=COPY_BATCH), COPY_BATCH):
+        existing = {obj.pk: obj for obj in model._base_manager.using(target).filter(pk__in=[o.pk for o in batch])}
+        insert_rows(model, [o for o in batch if o.pk not in existing], target)
+        changed = [o for o in batch if o.pk in existing and values(o) != values(existing[o.pk])]
+        # bulk_update writes the values as they are (no auto_now), like insert_rows
+        model._base_manager.using(target).bulk_update(changed, [f.name for f in fields], batch_size=500)
+        copied += len(batch) - len(existing) + len(changed)
+    return copied
+
+
+def remove_deleted(model, owner_id, source, target):
+    ids = set(model._base_manager.using(source).filter(owner_id=owner_id).values_list("pk", flat=True))
+    gone = set(model._base_manager.using(target).filter(owner_id=owner_id).values_list("pk", flat=True)) - ids
+    delete_rows(model, target, gone)
+    return len(gone)
+
+
+def sync_user(owner_id, source, target, since=None):
+    """One pass making ``target`` hold what ``source`` has of a user's ledger; returns rows written."""
+    with transaction.atomic(using=target):
+        written = sum(copy_changes(model, owner_id, source, target, since) for model in ledger_models())
+        written += sum(remove_deleted(model, owner_id, source, target) for model in reversed(ledger_models()))
+    return written
+
+
+def verify_copy(owner_id, source, target):
+    for model in ledger_models():
+        counts = [model._base_manager.using(alias).filter(owner_id=owner_id).count() for alias in (source, target)]
+        if counts[0] != counts[1]:
+            raise ShardMoveError(f"{model.__name__}: {counts[0]} row(s) on {source} but {counts[1]} on {target}")
+
+
+def wait_for_jobs(owner_id, timeout):
+    deadline = time.monotonic() + timeout
+    while Job.objects.filter(owner_id=owner_id, status=Job.RUNNING).exists():
+        if time.monotonic() > deadline:
+            raise ShardMoveError("A background job for this user is still running")
+        time.sleep(0.5)
+
+
+def move_user(user, target, grace=2.0, timeout=60.0, log=None):
+    """
+    Move a user's ledger to ``target`` while they keep using the app. Rows are copied while
+    writes continue, then caught up on what changed meanwhile; only the final catch-up runs
+    with the user read-only (writes answer 503, their jobs wait). The directory then points
+    at ``target`` and the old copy is deleted.
+    """
+    log = log or (lambda message: None)
+    if target not in settings.TRACKER_SHARDS:
+        raise ShardMoveError(f"Unknown shard {target!r}; configured: {', '.join(settings.TRACKER_SHARDS)}")
+    source = shard_for(user.pk)
+    if source == target:
+        raise ShardMoveError(f"{user.username} is already on {target}")
+    # Ring-placed users get a directory entry, so where they live no longer depends on the ring
+    ShardAssignment.objects.update_or_create(user=user, defaults={"shard": source})
+
+    clear_user(target, user.pk)  # whatever an interrupted move left behind
+    if target != DEFAULT_DB_ALIAS:
+        mirror_user(user, target)
+
+    since = None
+    for attempt in range(1, CATCH_UP_PASSES + 1):
+        started = timezone.now() - CLOCK_MARGIN
+        try:
+            written = sync_user(user.pk, source, target, since)
+        except IntegrityError:
+            # A row was copied before its newly created parent; the next pass gets both
+            log(f"pass {attempt}: rolled back, the ledger changed underneath it")
+            continue
+        since = started
+        log(f"pass {attempt}: copied {written} row(s) to {target}")
+
+    ShardAssignment.objects.filter(user=user).update(read_only=True)
+    try:
+        time.sleep(grace)  # requests that started before the freeze
+        wait_for_jobs(user.pk, timeout)
+        written = sync_user(user.pk, source, target, since)
+        verify_copy(user.pk, source, target)
+    except BaseException:
+        ShardAssignment.objects.filter(user=user).update(read_only=False)
+        raise
+    log(f"final pass: copied {written} row(s) with writes paused")
+
+    ShardAssignment.objects.filter(user=user).update(shard=target, read_only=False, moved_at=timezone.now())
+    clear_user(source, user.pk)
+    # Cached pages hold model instances bound to the old database
+    bump_version(user.pk)
+    log(f"{user.username} moved from {source} to {target}")
+    return source
@@ -0,0 +1,176 @@
+from django.contrib.auth.models import User
+from django.db.models import QuerySet
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .balances import apply_balance_delta
+from .budget_templates import DEFAULT_TEMPLATE, provision_template
+from .caching import bump_version
+from .closing import close_finished_months, reopen_from
+from .models import Account, BudgetAllocation, BudgetMonth, Category, CategoryGroup, Payee, Transaction
+from .reconciliation import LockedTransactionError, locked_changes
+from .rollups import apply_delta
+from .shards import clear_user, place_user, reserve_id_range, shard_for, use_shard
+from .typeahead import count_use
+
+
+def as_date(value):
+    return Transaction._meta.get_field("date").to_python(value)
+
+
+def cascading_from(origin, *models):
+    """True when a delete was started by one of ``models`` (a cascade we don't need to track)."""
+    if isinstance(origin, QuerySet):
+        return issubclass(origin.model, models)
+    return isinstance(origin, models)
+
+
+# --- new users: a shard, and a starter budget from the template chosen at signup ---
+@receiver(post_save, sender=User)
+def create_default_categories(sender, instance, created, **kwargs):
+    if created:
+        alias = place_user(instance)
+        template = getattr(instance, "budget_template", DEFAULT_TEMPLATE)
+        if template:
+            with use_shard(alias):
+                provision_template([instance], template, existing=False)
+
+
+# --- deleted users: the cascade only reaches "default", so clear their shard too ---
+@receiver(pre_delete, sender=User)
+def remember_shard(sender, instance, **kwargs):
+    # The directory entry is gone by post_delete
+    instance._shard = shard_for(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def clear_shard(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    shard = getattr(instance, "_shard", DEFAULT_DB_ALIAS)
+    if using == DEFAULT_DB_ALIAS and shard != DEFAULT_DB_ALIAS:
+        clear_user(shard, instance.pk)
+
+
+@receiver(post_migrate)
+def reserve_shard_ids(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    if sender.name == "tracker":
+        reserve_id_range(using)
+
+
+# --- transactions: category month rollups, account balances and payee/account use counts ---
+@receiver(pre_save, sender=Transaction)
+def remember_transaction(sender, instance, **kwargs):
+    instance._previous = None
+    if instance.pk:
+        instance._previous = old = Transaction.objects.filter(pk=instance.pk) \
+            .values("category_id", "date", "amount", "account_id", "payee_id", "cleared", "reconciled").first()
+        if old and old["reconciled"] and (changed := locked_changes(old, instance)):
+            raise LockedTransactionError(f"Transaction {instance.pk} is reconciled; can't change {', '.join(changed)}")
+
+
+@receiver(pre_delete, sender=Transaction)
+def keep_reconciled(sender, instance, origin=None, **kwargs):
+    # Whole accounts and users still go, reconciled history and all
+    if instance.reconciled and not cascading_from(origin, User, Account):
+        raise LockedTransactionError(f"Transaction {instance.pk} is reconciled and can't be deleted")
+
+
+@receiver(post_save, sender=Transaction)
+def transaction_saved(sender, instance, **kwargs):
+    old = getattr(instance, "_previous", None)
+    if old:
+        apply_delta(instance.owner_id, old["category_id"], old["date"], activity=-old["amount"])
+        apply_balance_delta(old["account_id"], -old["amount"], old["cleared"])
+    apply_delta(instance.owner_id, instance.category_id, as_date(instance.date), activity=instance.amount)
+    apply_balance_delta(instance.account_id, instance.amount, instance.cleared)
+    for model, field in ((Account, "account_id"), (Payee, "payee_id")):
+        before, after = old and old[field], getattr(instance, field)
+        if not old or before != after:
+            count_use(model, before, -1)
+            count_use(model, after, 1)
+
+
+@receiver(post_delete, sender=Transaction)
+def transaction_deleted(sender, instance, origin=None, **kwargs):
+    if cascading_from(origin, User):
+        return
+    if not cascading_from(origin, CategoryGroup, Category):
+        apply_delta(instance.owner_id, instance.category_id, as_date(instance.date), activity=-instance.amount)
+    if not cascading_from(origin, Account):
+        apply_balance_delta(instance.account_id, -instance.amount, instance.cleared)
+        count_use(Account, instance.account_id, -1)
+    # Deleting a payee nulls its transactions rather than deleting them, so this is never that cascade
+    count_use(Payee, instance.payee_id, -1)
+
+
+# --- budget allocations: category month rollups ---
+@receiver(pre_save, sender=BudgetAllocation)
+def remember_allocation(sender, instance, **kwargs):
+    instance._previous = None
+    if instance.pk:
+        instance._previous = BudgetAllocation.objects.filter(pk=instance.pk) \
+            .values("category_id", "month__month", "budgeted").first()
+
+
+@receiver(post_save, sender=BudgetAllocation)
+def rollup_allocation_saved(sender, instance, **kwargs):
+    old = getattr(instance, "_previous", None)
+    if old:
+        apply_delta(instance.owner_id, old["category_id"], old["month__month"], budgeted=-old["budgeted"])
+    apply_delta(instance.owner_id, instance.category_id, instance.month.month, budgeted=instance.budgeted)
+
+
+@receiver(post_delete, sender=BudgetAllocation)
+def rollup_allocation_deleted(sender, instance, origin=None, **kwargs):
+    if cascading_from(origin, User, CategoryGroup, Category):
+        return
+    apply_delta(instance.owner_id, instance.category_id, instance.month.month, budgeted=-instance.budgeted)
+
+
+# --- month close: opening a month closes the finished ones; edits reopen closed months ---
+@receiver(post_save, sender=BudgetMonth)
+def month_opened(sender, instance, created, **kwargs):
+    if created:
+        close_finished_months(instance.owner_id, instance.month)
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_save, sender=BudgetAllocation)
+def reopen_edited_month(sender, instance, **kwargs):
+    month = as_date(instance.date) if sender is Transaction else instance.month.month
+    old = getattr(instance, "_previous", None)
+    if old:
+        month = min(month, old["date"] if sender is Transaction else old["month__month"])
+    reopen_from(instance.owner_id, month)
+
+
+@receiver(post_delete, sender=Transaction)
+@receiver(post_delete, sender=BudgetAllocation)
+def reopen_deleted_month(sender, instance, origin=None, **kwargs):
+    if cascading_from(origin, User):
+        return
+    reopen_from(instance.owner_id, as_date(instance.date) if sender is Transaction else instance.month.month)
+
+
+# --- cache invalidation: any change to budget data moves the owner's data version ---
+@receiver(post_save, sender=Transaction)
+@receiver(post_save, sender=BudgetAllocation)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=CategoryGroup)
+@receiver(post_save, sender=Account)
+@receiver(post_delete, sender=Transaction)
+@receiver(post_delete, sender=BudgetAllocation)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=CategoryGroup)
+@receiver(post_delete, sender=Account)
+def budget_data_changed(sender, instance, **kwargs):
+    bump_version(instance.owner_id)
+
+
+# --- typeahead: new, renamed or removed names invalidate the per-user prefix index ---
+@receiver(post_save, sender=Payee)
+@receiver(post_save, sender=Account)
+@receiver(post_delete, sender=Payee)
+@receiver(post_delete, sender=Account)
+def names_changed(sender, instance, **kwargs):
+    bump_version(instance.owner_id, sender._meta.model_name)
@@ -0,0 +1,248 @@
+"""
+Synthetic ledgers for load and scale testing.
+
+Each generated user gets checking/savings/credit-card accounts, twice-monthly paychecks,
+recurring bills on fixed days, and discretionary spending spread over a long tail of payees
+(Zipf-weighted, so a handful of merchants dominate the way they do in real ledgers).
+Everything is written with ``bulk_create``; rollups, balances and use counts are rebuilt once at the end.
+"""
+import calendar
+import math
+import random
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .balances import recompute_balances
+from .budget import first_of_month, months_ending
+from .caching import bump_version
+from .models import (
+    Account,
+    BudgetAllocation,
+    BudgetMonth,
+    Category,
+    CategoryGroup,
+    Payee,
+    Transaction,
+    transaction_fingerprint,
+)
+from .rollups import rebuild_rollups
+from .shards import for_user, ledger_db
+from .typeahead import recount_uses
+
+BATCH_SIZE = 5000
+PAYDAYS = (1, 15)
+
+# category name -> (payee, share of monthly income, day of month, relative jitter)
+BILLS = {
+    "Rent/Mortgage": ("Landlord", 0.30, 1, 0.0),
+    "Utilities": ("City Power & Water", 0.04, 6, 0.25),
+    "Insurance": ("Acme Insurance", 0.03, 12, 0.0),
+    "Transportation": ("Metro Transit", 0.02, 3, 0.0),
+    "Entertainment": ("Netflix", 0.005, 18, 0.0),
+}
+# Budgeted into every month but never spent from
+SAVINGS = ("Emergency Fund", "Retirement", "Investments")
+# Typical purchase size per category; anything not listed uses the default
+TYPICAL_SPEND = {"Groceries": 60, "Dining Out": 25, "Household Supplies": 20, "Personal Care": 18, "Healthcare": 45}
+DEFAULT_SPEND = 30
+SPEND_SIGMA = 0.8
+
+KNOWN_PAYEES = [
+    "Amazon", "Walmart", "Target", "Costco", "Starbucks", "Shell", "Kroger", "Trader Joe's", "Uber",
+    "CVS", "Home Depot", "Chipotle", "Whole Foods", "Spotify", "Lyft", "McDonald's", "Walgreens",
+    "Safeway", "Best Buy", "Apple",
+]
+PAYEE_WORDS = [
+    "Corner", "Main Street", "Blue", "Golden", "Harbor", "Oak", "City", "Sunrise", "Pine", "River",
+    "Summit", "Maple", "Union", "Lakeside", "Old Town", "Northside", "Cedar", "Silver", "Village", "Park",
+]
+PAYEE_KINDS = [
+    "Cafe", "Market", "Deli", "Hardware", "Books", "Pharmacy", "Bistro", "Garage", "Salon", "Bakery",
+    "Pizza", "Taqueria", "Gym", "Florist", "Cinema", "Grill", "Pet Supply", "Outfitters", "Noodles", "Tea House",
+]
+
+
+def cents(value):
+    return Decimal(int(round(value * 100))).scaleb(-2)
+
+
+def payee_names(rng, count):
+    names = list(KNOWN_PAYEES[:count])
+    seen = set(names)
+    while len(names) < count:
+        name = f"{rng.choice(PAYEE_WORDS)} {rng.choice(PAYEE_KINDS)}"
+        if name in seen:
+            name = f"{name} #{len(names)}"
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+class LedgerGenerator:
+    """Build one user's synthetic ledger. Output is fully determined by ``seed``."""
+
+    def __init__(self, user, months=12, tx_per_month=60, categories=None, seed=0,
+                 batch_size=BATCH_SIZE, today=None):
+        self.user = user
+        self.today = today or date.today()
+        self.months = months_ending(self.today, months)
+        self.tx_per_month = tx_per_month
+        self.category_count = categories
+        self.batch_size = batch_size
+        self.rng = random.Random(seed)
+        self.created = 0
+
+    def run(self):
+        with transaction.atomic(using=ledger_db()):
+            self.setup_accounts()
+            self.setup_categories()
+            self.setup_payees()
+            self.setup_budget()
+            batch = []
+            for tx in self.transactions():
+                batch.append(tx)
+                if len(batch) >= self.batch_size:
+                    self.flush(batch)
+                    batch = []
+            if batch:
+                self.flush(batch)
+            rebuild_rollups(self.user.id)
+            recompute_balances(self.user.id)
+            recount_uses(self.user.id)
+        bump_version(self.user.id, "payee")
+        bump_version(self.user.id, "account")
+        return {"transactions": self.created, "months": len(self.months), "payees": len(self.payees)}
+
+    def flush(self, batch):
+        Transaction.objects.bulk_create(batch, batch_size=self.batch_size)
+        self.created += len(batch)
+
+    # --- reference data ---
+    def setup_accounts(self):
+        rng = self.rng
+        openings = {
+            "Checking": cents(rng.uniform(500, 5000)),
+            "Savings": cents(rng.uniform(1000, 20000)),
+            "Credit Card": cents(-rng.uniform(0, 1500)),
+        }
+        # bulk_create skips Account.save(), so the running balances start from the opening balance here
+        Account.objects.bulk_create([
+            Account(owner=self.user, name=name, opening_balance=opening, balance=opening, cleared_balance=opening)
+            for name, opening in openings.items()
+        ])
+        self.accounts = dict(Account.objects.filter(owner=self.user).values_list("name", "id"))
+
+    def setup_categories(self):
+        categories = list(Category.objects.filter(owner=self.user).order_by("group__sort", "sort", "id"))
+        wanted = self.category_count or len(categories)
+        if wanted > len(categories):
+            group, _ = CategoryGroup.objects.get_or_create(owner=self.user, name="Miscellaneous",
+                                                           defaults={"sort": 99})
+            Category.objects.bulk_create([
+                Category(owner=self.user, group=group, name=f"Misc {i}", sort=i)
+                for i in range(1, wanted - len(categories) + 1)
+            ])
+            categories = list(Category.objects.filter(owner=self.user).order_by("group__sort", "sort", "id"))
+        self.categories = {c.name: c.id for c in categories[:wanted]}
+
+        self.bills = {name: spec for name, spec in BILLS.items() if name in self.categories}
+        self.discretionary = [n for n in self.categories if n not in self.bills and n not in SAVINGS]
+        self.discretionary_count = max(self.tx_per_month - len(PAYDAYS) - len(self.bills), 0)
+
+    def setup_payees(self):
+        rng = self.rng
+        count = max(20, self.tx_per_month * 3)
+        names = payee_names(rng, count)
+        extra = ["Employer"] + [spec[0] for spec in self.bills.values()]
+        Payee.objects.bulk_create([Payee(owner=self.user, name=n) for n in names + extra])
+        ids = dict(Payee.objects.filter(owner=self.user).values_list("name", "id"))
+        self.payees = ids
+
+        # Long tail: the payee at rank r is picked with weight 1 / r**1.1, and always files under one category
+        self.spend_payees = [
+            (ids[name], self.categories[rng.choice(self.discretionary)] if self.discretionary else None)
+            for name in names
+        ]
+        self.spend_weights = [1 / (rank ** 1.1) for rank in range(1, len(names) + 1)]
+
+    def setup_budget(self):
+        BudgetMonth.objects.bulk_create([BudgetMonth(owner=self.user, month=m) for m in self.months])
+        month_ids = dict(BudgetMonth.objects.filter(owner=self.user).values_list("month", "id"))
+
+        expected = {}
+        weight_total = sum(self.spend_weights)
+        for (payee_id, category_id), weight in zip(self.spend_payees, self.spend_weights):
+            if category_id is not None:
+                expected[category_id] = expected.get(category_id, 0) + weight / weight_total * self.discretionary_count
+        name_by_id = {v: k for k, v in self.categories.items()}
+        mean = {
+            cid: TYPICAL_SPEND.get(name_by_id[cid], DEFAULT_SPEND) * math.exp(SPEND_SIGMA ** 2 / 2)
+            for cid in expected
+        }
+        spend = sum(expected[c] * mean[c] for c in expected)
+        bills = sum(share for _, share, _, _ in self.bills.values())
+        # Monthly take-home covers the bills plus expected discretionary spending, with slack to save
+        self.income = max(cents(self.rng.uniform(3000, 10000)), cents((spend * 1.15) / max(1 - bills, 0.2)))
+
+        budget = {self.categories[name]: cents(float(self.income) * spec[1]) for name, spec in self.bills.items()}
+        for cid in expected:
+            budget[cid] = cents(round(expected[cid] * mean[cid], -1))
+        savings = [self.categories[n] for n in SAVINGS if n in self.categories]
+        leftover = float(self.income) - sum(float(v) for v in budget.values())
+        for cid in savings:
+            budget[cid] = cents(max(leftover, 0) * 0.8 / len(savings))
+
+        BudgetAllocation.objects.bulk_create([
+            BudgetAllocation(owner=self.user, month_id=month_ids[m], category_id=cid, budgeted=amount)
+            for m in self.months for cid, amount in budget.items() if amount
+        ], batch_size=self.batch_size)
+
+    # --- ledger ---
+    def transactions(self):
+        rng = self.rng
+        checking, card = self.accounts["Checking"], self.accounts["Credit Card"]
+        paycheck = cents(float(self.income) / len(PAYDAYS))
+        name_by_id = {v: k for k, v in self.categories.items()}
+
+        for month in self.months:
+            last_day = calendar.monthrange(month.year, month.month)[1]
+            if month == first_of_month(self.today):
+                last_day = self.today.day
+
+            for day in PAYDAYS:
+                if day <= last_day:
+                    yield self.make(checking, self.payees["Employer"], None, paycheck, month.replace(day=day),
+                                    "Paycheck")
+            for name, (payee, share, day, jitter) in self.bills.items():
+                if day <= last_day:
+                    amount = float(self.income) * share * (1 + rng.uniform(-jitter, jitter))
+                    yield self.make(checking, self.payees[payee], self.categories[name], -cents(amount),
+                                    month.replace(day=day), f"{name} bill")
+
+            picks = rng.choices(self.spend_payees, weights=self.spend_weights, k=self.discretionary_count)
+            for payee_id, category_id in picks:
+                typical = TYPICAL_SPEND.get(name_by_id.get(category_id), DEFAULT_SPEND)
+                amount = rng.lognormvariate(math.log(typical), SPEND_SIGMA)
+                account = card if rng.random() < 0.6 else checking
+                yield self.make(account, payee_id, category_id, -cents(max(amount, 0.5)),
+                                month.replace(day=rng.randint(1, last_day)), "")
+
+    def make(self, account_id, payee_id, category_id, amount, day, memo):
+        # Recent activity is partly still pending, older activity has cleared
+        cleared = (self.today - day).days > 7 or self.rng.random() < 0.5
+        return Transaction(
+            owner=self.user, account_id=account_id, payee_id=payee_id, category_id=category_id,
+            amount=amount, date=day, memo=memo, cleared=cleared,
+            fingerprint=transaction_fingerprint(account_id, day, amount, memo),
+        )
+
+
+def generate_user(username, password=None, seed=0, **options):
+    """Create ``username`` and fill their ledger; a module-level entry point so worker processes can call it."""
+    user = User.objects.create_user(username, password=password)
+    with for_user(user.pk):
+        result = LedgerGenerator(user, seed=f"{seed}:{username}", **options).run()
+    return username, result
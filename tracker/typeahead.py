@@ -0,0 +1,87 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+
+from django.db.models import Count, F
+
+from .caching import data_version
+from .models import Account, Payee, Transaction
+
+MAX_USERS = 1000
+MAX_AGE = 300  # seconds before usage counts are refreshed even without a new name
+LIMIT = 10
+
+# Usage comes from the maintained ``uses`` counters, so a rebuild reads one user's names off
+# (owner, name) instead of counting their ledger
+SOURCES = {
+    "payee": lambda user_id: Payee.objects.filter(owner_id=user_id).order_by("name"),
+    "account": lambda user_id: Account.objects.filter(owner_id=user_id).order_by("name"),
+}
+
+
+class PrefixIndex:
+    """Names sorted case-insensitively, so a prefix is a bisect range; matches are ranked by use count."""
+
+    def __init__(self, entries):
+        self.entries = sorted(entries, key=lambda e: e[0].lower())
+        self.keys = [name.lower() for name, _, _ in self.entries]
+
+    def search(self, prefix, limit=LIMIT):
+        prefix = prefix.lower()
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + "\uffff")
+        matches = self.entries[lo:hi]
+        return sorted(matches, key=lambda e: (-e[1], e[0].lower()))[:limit]
+
+
+# (kind, user_id) -> (version, built_at, PrefixIndex); per process, LRU-bounded
+_indexes = OrderedDict()
+_lock = threading.Lock()
+
+
+def get_index(kind, user_id):
+    version = data_version(user_id, kind)
+    key = (kind, user_id)
+    with _lock:
+        cached = _indexes.get(key)
+        if cached and cached[0] == version and time.monotonic() - cached[1] < MAX_AGE:
+            _indexes.move_to_end(key)
+            return cached[2]
+
+    index = PrefixIndex(SOURCES[kind](user_id).values_list("name", "uses", "id"))
+    with _lock:
+        _indexes[key] = (version, time.monotonic(), index)
+        _indexes.move_to_end(key)
+        while len(_indexes) > MAX_USERS:
+            _indexes.popitem(last=False)
+    return index
+
+
+def count_use(model, pk, delta):
+    """Move one payee's or account's ``uses`` by ``delta`` (per transaction from signals, per import in bulk)."""
+    if pk is not None and delta:
+        model.objects.filter(pk=pk).update(uses=F("uses") + delta)
+
+
+def recount_uses(owner_id):
+    """Reset ``uses`` on a user's payees and accounts from one grouped query each, after writes that skip signals."""
+    for model, field in ((Payee, "payee_id"), (Account, "account_id")):
+        counts = dict(
+            Transaction.objects.filter(owner_id=owner_id, **{f"{field}__isnull": False})
+            .values(field).annotate(n=Count("pk")).values_list(field, "n").order_by()
+        )
+        rows = list(model.objects.filter(owner_id=owner_id).only("pk"))
+        for row in rows:
+            row.uses = counts.get(row.pk, 0)
+        model.objects.bulk_update(rows, ["uses"], batch_size=500)
+
+
+def suggest(kind, user_id, prefix, limit=LIMIT):
+    """Up to ``limit`` of the user's payee/account names starting with ``prefix``, most used first."""
+    if kind not in SOURCES:
+        raise ValueError(f"Unknown typeahead kind {kind!r}")
+    return [
+        {"id": pk, "name": name, "uses": uses}
+        for name, uses, pk in get_index(kind, user_id).search(prefix.strip(), limit)
+    ]
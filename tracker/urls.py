@@ -1,6 +1,6 @@
 from django.urls import path
 from django.contrib.auth import views as auth_views
-from . import views
+from . import api, views
 
 urlpatterns = [
     path("", views.home, name="home"),
@@ -8,9 +8,26 @@ urlpatterns = [
     path("logout/", views.logout_view, name="logout"),
     path("dashboard/", views.dashboard, name="dashboard"),
     path("transactions/", views.transactions, name="transactions"),
+    path("transactions/import/", views.transactions_import, name="transactions_import"),
+    path("transactions/export/", views.transactions_export, name="transactions_export"),
+    path("jobs/<int:job_id>/download/", views.job_download, name="job_download"),
+    path("accounts/<int:account_id>/reconcile/", views.account_reconcile, name="account_reconcile"),
     path("categories/", views.categories, name="categories"),
     path("categories/create/", views.category_create, name="category_create"),
     path("categories/group/create/", views.category_group_create, name="category_group_create"),
     path("categories/<int:category_id>/delete/", views.category_delete, name="category_delete"),
     path("budget/allocate/", views.budget_allocate, name="budget_allocate"),
+    path("reports/", views.reports, name="reports"),
+    path("charts/balance/", views.chart_balance, name="chart_balance"),
+    path("charts/net-worth/", views.chart_net_worth, name="chart_net_worth"),
+    path("charts/spending/", views.chart_spending, name="chart_spending"),
+    path("instrumentation/", views.instrumentation, name="instrumentation"),
+    path("api/summary/", api.api_summary, name="api_summary"),
+    path("api/categories/", api.api_categories, name="api_categories"),
+    path("api/transactions/", api.api_transactions, name="api_transactions"),
+    path("api/typeahead/", api.api_typeahead, name="api_typeahead"),
+    path("api/budget/allocate/", api.api_budget_allocate, name="api_budget_allocate"),
+    path("api/reports/trends/", api.api_trends, name="api_trends"),
+    path("api/jobs/", api.api_jobs, name="api_jobs"),
+    path("api/jobs/<int:job_id>/", api.api_job, name="api_job"),
 ]
\ No newline at end of file
@@ -1,12 +1,17 @@
+import io
 from datetime import date, datetime
-from decimal import Decimal, ROUND_HALF_UP
+from decimal import Decimal
 
 from django.contrib import messages
 from django.contrib.auth import logout, login
-from django.contrib.auth.decorators import login_required
-from django.db.models import Sum
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.db import router
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
-from django.views.decorators.http import require_POST
+from django.urls import reverse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import condition, require_POST
 
 from .models import (
     Account,
@@ -15,13 +20,30 @@ from .models import (
     BudgetMonth,
     BudgetAllocation,
     Transaction, Payee,
+    Job,
 )
 
+from .budget import budget_fragments, first_of_month, dashboard_context
+from .caching import etag_for, get_or_compute
+from .charts import balance_series, net_worth_series, parse_chart_params, spending_series
+from .exports import csv_lines, export_rows, filtered_transactions, jsonl_lines
+from .importers import StatementError, detect_format
+from .jobs import EXPORT_FORMATS, enqueue, export_path
+from .instrumentation import load_dumps, merge_snapshots, registry, report
+from .reconciliation import ReconciliationError, propose, reconcile
+from .register import decode_cursor, filter_transactions, keyset_page
+from .reports import parse_trend_params, trend_report
+from .routers import replica_reads
+from .search import parse_page, search_page
+
 from .forms import (
     SignUpForm,
     CategoryForm,
     CategoryGroupForm,
-    TransactionForm
+    TransactionForm,
+    TransactionFilterForm,
+    StatementImportForm,
+    ReconcileForm,
 )
 
 from django.contrib.auth import authenticate, login, logout
@@ -158,11 +180,25 @@ def category_delete(request, category_id):
     return redirect("categories")
 
 
+# --- conditional GETs: pages answer 304 while the user's data fingerprint is unchanged ---
+def data_etag(request, *args, **kwargs):
+    """
+    Strong ETag for one user's page: their data fingerprint, the URL and today's date (pages
+    default to the current month). Pages with flash messages waiting are always rendered.
+    """
+    if not request.user.is_authenticated or len(messages.get_messages(request)):
+        return None
+    return etag_for(request.user.id, request.path, request.GET.urlencode(), date.today())
+
+
+def conditional_page(view):
+    # Inside replica_reads, so the fingerprint comes from the same database as the page
+    return replica_reads(cache_control(private=True, no_cache=True)(condition(etag_func=data_etag)(view)))
+
+
 @login_required
+@conditional_page
 def transactions(request):
-    tx = Transaction.objects.filter(owner=request.user).select_related("payee", "category", "account") \
-        .order_by("-date", "-id")[:200]
-
     if request.method == "POST":
         form = TransactionForm(request.POST, owner=request.user)
         if form.is_valid():
@@ -176,7 +212,7 @@ def transactions(request):
                 account, _ = Account.objects.get_or_create(
                     owner=request.user,
                     name=account_name.strip(),
-                    defaults={'on_budget': True, 'balance': 0}
+                    defaults={'on_budget': True}
                 )
             obj.account = account
 
@@ -196,22 +232,126 @@ def transactions(request):
     else:
         form = TransactionForm(owner=request.user)
 
-    # Get existing accounts and payees for datalist
-    existing_accounts = Account.objects.filter(owner=request.user).values_list('name', flat=True)
-    existing_payees = Payee.objects.filter(owner=request.user).values_list('name', flat=True)
+    # Only a page that is actually rendered (GET, or a form shown again with its errors) reads the register
+    filter_form = TransactionFilterForm(request.GET or None, owner=request.user)
+    tx = Transaction.objects.filter(owner=request.user).select_related("payee", "category", "account")
+    search, account = "", None
+    if filter_form.is_valid():
+        tx = filter_transactions(tx, filter_form.cleaned_data)
+        search, account = filter_form.cleaned_data["q"], filter_form.cleaned_data["account"]
+    if search:
+        # Ranked matches page by number; the plain register keeps its (date, id) keyset
+        page = parse_page(request.GET.get("page"))
+        rows, has_more = get_or_compute(request.user.id, "search", request.GET.urlencode(),
+                                        lambda: search_page(tx, search, page))
+        newer, older = (page - 1 if page > 1 else None), (page + 1 if has_more else None)
+    else:
+        rows, newer, older = get_or_compute(request.user.id, "register", request.GET.urlencode(), lambda: keyset_page(
+            tx,
+            after=decode_cursor(request.GET.get("after")),
+            before=decode_cursor(request.GET.get("before")),
+        ))
 
     return render(request, "tracker/transactions.html", {
-        "transactions": tx,
+        "transactions": rows,
+        "filter_form": filter_form,
+        "import_form": StatementImportForm(),
+        "newer_query": page_query(request, "page" if search else "before", newer),
+        "older_query": page_query(request, "page" if search else "after", older),
+        "export_query": page_query(request, "format", "csv"),
+        "reconcile_account": account,
         "form": form,
-        "existing_accounts": existing_accounts,
-        "existing_payees": existing_payees
     })
 
-def money(x):
-    if x is None:
-        return Decimal("0.00")
-    return Decimal(x).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+@login_required
+def account_reconcile(request, account_id):
+    """
+    GET with a statement date and ending balance proposes the pending transactions it covers;
+    POST confirms the ones ticked and locks them.
+    """
+    account = get_object_or_404(Account, pk=account_id, owner=request.user)
+    if request.method == "POST":
+        form = ReconcileForm(request.POST)
+        if form.is_valid():
+            ids = [int(v) for v in request.POST.getlist("transactions") if v.isdigit()]
+            try:
+                done = reconcile(account, form.cleaned_data["statement_date"], form.cleaned_data["ending_balance"], ids)
+            except ReconciliationError as e:
+                messages.error(request, str(e))
+            else:
+                messages.success(request, f"{account.name} reconciled to {done.statement_date:%Y-%m-%d}: "
+                                          f"{done.transaction_count} transaction(s) locked.")
+                return redirect(f"{reverse('transactions')}?account={account.pk}")
+    else:
+        form = ReconcileForm(request.GET or None, initial={"statement_date": date.today()})
 
+    proposal = None
+    if form.is_valid():
+        proposal = propose(account, form.cleaned_data["statement_date"], form.cleaned_data["ending_balance"])
+    return render(request, "tracker/reconcile.html", {
+        "account": account,
+        "form": form,
+        "proposal": proposal,
+        "last": account.reconciliations.order_by("-statement_date", "-id").first(),
+    })
+
+
+@login_required
+@require_POST
+def transactions_import(request):
+    form = StatementImportForm(request.POST, request.FILES)
+    if not form.is_valid():
+        messages.error(request, "Choose a statement file to import.")
+        return redirect("transactions")
+
+    upload = form.cleaned_data["statement"]
+    try:
+        fmt = detect_format(upload.name)
+        text = upload.read().decode("utf-8-sig")
+    except (StatementError, UnicodeDecodeError) as e:
+        messages.error(request, f"Import failed: {e}")
+        return redirect("transactions")
+
+    # Parsing and inserting runs in a background worker (manage.py run_workers); the page shows its progress
+    enqueue(request.user, "import_statement", payload=text, format=fmt,
+            account_name=form.cleaned_data["account_name"].strip() or None)
+    messages.info(request, f"{upload.name} is queued for import.")
+    return redirect("transactions")
+
+@login_required
+@replica_reads
+def transactions_export(request):
+    if request.method == "POST":
+        # Too big to stream within the request timeout: write the file in a background job
+        fmt = request.GET.get("format", "csv")
+        if fmt not in EXPORT_FORMATS:
+            fmt = "csv"
+        query = request.GET.copy()
+        query.pop("format", None)
+        enqueue(request.user, "export_transactions", format=fmt, query=query.urlencode())
+        messages.info(request, "Export queued; a download link appears once it is ready.")
+        return redirect("transactions")
+
+    tx = filtered_transactions(request.user, request.GET)
+    # The rows stream after the view returns, outside replica_reads, so pick the database now
+    tx = tx.using(router.db_for_read(Transaction))
+
+    if request.GET.get("format") == "jsonl":
+        response = StreamingHttpResponse(jsonl_lines(export_rows(tx)), content_type="application/x-ndjson")
+        filename = "transactions.jsonl"
+    else:
+        response = StreamingHttpResponse(csv_lines(export_rows(tx)), content_type="text/csv")
+        filename = "transactions.csv"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+@login_required
+def job_download(request, job_id):
+    job = get_object_or_404(Job, pk=job_id, owner=request.user, kind="export_transactions", status=Job.DONE)
+    path = export_path(job)
+    if not path.exists():
+        raise Http404("The export file is gone; export again.")
+    return FileResponse(open(path, "rb"), as_attachment=True, filename=f"transactions{path.suffix}")
 
 @require_POST
 def logout_view(request):
@@ -220,8 +360,16 @@ def logout_view(request):
 
 
 # --- helpers ---
-def first_of_month(d: date) -> date:
-    return d.replace(day=1)
+def page_query(request, key, cursor):
+    """Current query string (filters kept, paging cursors dropped) plus ``key=cursor``."""
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params.pop("after", None)
+    params.pop("before", None)
+    params.pop("page", None)
+    params[key] = cursor
+    return params.urlencode()
 
 
 def parse_month_param(request):
@@ -237,86 +385,57 @@ def parse_month_param(request):
 
 # --- dashboard (YNAB-style) ---
 @login_required
+@conditional_page
 def dashboard(request):
-    user = request.user
     sel_month, month_value = parse_month_param(request)
-    next_month = (sel_month.replace(day=28) + (date.resolution * 4)).replace(day=1)
-    prev_month = (sel_month.replace(day=1) - date.resolution).replace(day=1)
-
-    # Ensure a BudgetMonth exists
-    bm, _ = BudgetMonth.objects.get_or_create(owner=user, month=sel_month)
-
-    # Summary cards
-    on_budget_balance = Account.objects.filter(owner=user, on_budget=True) \
-                            .aggregate(s=Sum("balance"))["s"] or Decimal("0.00")
-
-    activity_this_month = Transaction.objects.filter(
-        owner=user, date__gte=sel_month, date__lt=next_month
-    ).aggregate(s=Sum("amount"))["s"] or Decimal("0.00")
-
-    budgeted_this_month = BudgetAllocation.objects.filter(owner=user, month=bm) \
-                              .aggregate(s=Sum("budgeted"))["s"] or Decimal("0.00")
-
-    total_budgeted_all = BudgetAllocation.objects.filter(owner=user) \
-                             .aggregate(s=Sum("budgeted"))["s"] or Decimal("0.00")
-    total_income_all = Transaction.objects.filter(owner=user, amount__gt=0) \
-                           .aggregate(s=Sum("amount"))["s"] or Decimal("0.00")
-
-    tbb = (on_budget_balance + total_income_all) - total_budgeted_all
-
-    # Build budget table rows by group
-    groups_ctx = []
-    month_activity_qs = Transaction.objects.filter(
-        owner=user, date__gte=sel_month, date__lt=next_month
-    )
-
-    for g in CategoryGroup.objects.filter(owner=user).order_by("sort", "name"):
-        rows = []
-        for c in g.categories.filter(hidden=False).order_by("sort", "name"):
-            # budgeted for selected month
-            alloc = BudgetAllocation.objects.filter(owner=user, month=bm, category=c).first()
-            budgeted = alloc.budgeted if alloc else Decimal("0.00")
-
-            # activity for selected month (expenses negative, income positive)
-            cat_act = month_activity_qs.filter(category=c).aggregate(s=Sum("amount"))["s"] or Decimal("0.00")
-
-            # FIXED: Correct available calculation - only include transactions up to selected month
-            prior_budgeted = BudgetAllocation.objects.filter(
-                owner=user,
-                category=c,
-                month__month__lt=sel_month
-            ).aggregate(s=Sum("budgeted"))["s"] or Decimal("0.00")
-
-            prior_activity = Transaction.objects.filter(
-                owner=user,
-                category=c,
-                date__lt=sel_month
-            ).aggregate(s=Sum("amount"))["s"] or Decimal("0.00")
-
-            available = (prior_budgeted + prior_activity) + budgeted + cat_act
-
-            rows.append({
-                "category": c,
-                "budgeted": money(budgeted),
-                "activity": money(cat_act),
-                "available": money(available),
-                "allocation_id": alloc.id if alloc else None,
-            })
-        groups_ctx.append({"name": g.name, "rows": rows})
-
-    ctx = {
-        "month_value": month_value,
-        "sel_month": sel_month,
-        "prev_month": prev_month.strftime("%Y-%m"),
-        "next_month": next_month.strftime("%Y-%m"),
-        "tbb": money(tbb),
-        "budgeted_this_month": money(budgeted_this_month),
-        "activity_this_month": money(activity_this_month),
-        "on_budget_balance": money(on_budget_balance),
-        "groups": groups_ctx,
-    }
+    ctx = get_or_compute(request.user.id, "dashboard", sel_month.isoformat(),
+                         lambda: dashboard_context(request.user, sel_month))
+    ctx = {**ctx, "month_value": month_value}
     return render(request, "tracker/dashboard.html", ctx)
 
+@login_required
+@conditional_page
+def reports(request):
+    end, month_value = parse_month_param(request)
+    months, window = parse_trend_params(request.GET)
+    report = get_or_compute(request.user.id, "trends", [end.isoformat(), months, window],
+                            lambda: trend_report(request.user, end, months, window))
+    return render(request, "tracker/reports.html", {
+        "report": report,
+        "month_value": month_value,
+        "months": months,
+        "window": window,
+        "month_choices": [6, 12, 24, 36, 60],
+    })
+
+
+# --- chart data: compact, downsampled series revalidated by ETag ---
+def chart_view(view):
+    """Login, gzip, and a 304 whenever the user's data hasn't changed since the client's copy."""
+    return login_required(replica_reads(cache_control(private=True, no_cache=True)(gzip_page(
+        condition(etag_func=data_etag)(view)))))
+
+
+@chart_view
+def chart_balance(request):
+    start, end, points, method = parse_chart_params(request.GET)
+    account = request.GET.get("account", "")
+    return JsonResponse(balance_series(request.user, start, end, int(account) if account.isdigit() else None,
+                                       points, method))
+
+
+@chart_view
+def chart_net_worth(request):
+    start, end, points, method = parse_chart_params(request.GET)
+    return JsonResponse(net_worth_series(request.user, start, end, points, method))
+
+
+@chart_view
+def chart_spending(request):
+    start, end, _, _ = parse_chart_params(request.GET)
+    return JsonResponse(spending_series(request.user, start, end))
+
+
 @login_required
 @require_POST
 def budget_allocate(request):
@@ -337,4 +456,20 @@ def budget_allocate(request):
     alloc.budgeted = amount
     alloc.save()
 
-    return redirect(f"/dashboard/?month={month_str}")
\ No newline at end of file
+    if request.headers.get("X-Requested-With") == "XMLHttpRequest":
+        return render_budget_fragments(request, budget_fragments(request.user, sel_month, [c.id]), sel_month)
+    return redirect(f"/dashboard/?month={month_str}")
+
+
+def render_budget_fragments(request, fragments, sel_month):
+    """Just the dashboard pieces an allocation edit changes, keyed by data-fragment for the page to swap in."""
+    return render(request, "tracker/partials/budget_fragments.html",
+                  {**fragments, "month_value": sel_month.strftime("%Y-%m")})
+
+
+@user_passes_test(lambda u: u.is_active and u.is_staff)
+def instrumentation(request):
+    """Per-view timings from this process, merged with the latest dumps of the other workers."""
+    ours = registry.snapshot()
+    others = [s for s in load_dumps() if s["pid"] != ours["pid"]]
+    return JsonResponse(report(merge_snapshots([ours, *others])))